@@ -0,0 +1,21 @@
+"""
+Benchmarks for styled forms. Run from the repository root, e.g.::
+
+    python -m benchmarks.construction
+"""
+import django
+from django.conf import settings
+
+
+def setup():
+    """Configure minimal Django settings needed to build and render forms"""
+    if not settings.configured:
+        settings.configure(
+            INSTALLED_APPS=["styled_forms"],
+            USE_I18N=False,
+            TEMPLATES=[{
+                "BACKEND": "django.template.backends.django.DjangoTemplates",
+                "APP_DIRS": True,
+            }],
+        )
+        django.setup()
@@ -0,0 +1,53 @@
+"""
+Micro benchmark of StyledForm construction time and per instance memory.
+
+    python -m benchmarks.construction
+"""
+import gc
+import sys
+import timeit
+import tracemalloc
+
+from . import setup
+
+setup()
+
+from styled_forms.forms import examples  # noqa: E402
+
+FORMS = ["TestForm", "TestForm1", "TestForm2", "TestForm3", "TestForm4"]
+
+
+def construction_time(form_class, number=2000):
+    """Return microseconds per form construction"""
+    timer = timeit.Timer(form_class)
+    return min(timer.repeat(repeat=5, number=number)) / number * 1e6
+
+
+def instance_memory(form_class, number=500):
+    """Return bytes allocated per form instance kept alive"""
+    form_class()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [form_class() for _ in range(number)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / len(kept)
+
+
+def main():
+    print("%-10s %12s %12s %10s" % ("form", "init us", "bytes/form", "dict keys"))
+    for name in FORMS:
+        form_class = getattr(examples, name)
+        form = form_class()
+        print("%-10s %12.1f %12.0f %10d" % (
+            name,
+            construction_time(form_class),
+            instance_memory(form_class),
+            len(form.__dict__),
+        ))
+    print("python %s" % sys.version.split()[0])
+
+
+if __name__ == "__main__":
+    main()
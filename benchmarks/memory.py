@@ -0,0 +1,68 @@
+"""
+Memory retained by example form instances kept alive, e.g. in a formset.
+
+    python -m benchmarks.memory
+
+Bytes per form are reported for unbound forms, bound forms after validation
+and validated forms after rendering.
+"""
+import gc
+import sys
+import tracemalloc
+
+from . import setup
+
+setup()
+
+from styled_forms.forms import examples  # noqa: E402
+
+from .suite import EXAMPLE_FORMS, make_data  # noqa: E402
+
+
+def retained_memory(make, number=200):
+    """Return bytes retained per object returned by make"""
+    make()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [make() for _ in range(number)]
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / len(kept)
+
+
+def form_states(form_class):
+    """Return functions creating unbound, validated and rendered forms"""
+    data = make_data(form_class)
+
+    def validated():
+        form = form_class(data=data)
+        try:
+            form.full_clean()
+        except Exception:
+            # Example forms with fields which can't be validated
+            pass
+        return form
+
+    def rendered():
+        form = validated()
+        try:
+            form.as_div()
+        except Exception:
+            pass
+        return form
+
+    return form_class, validated, rendered
+
+
+def main():
+    print("%-10s %12s %12s %12s" % ("form", "unbound B", "validated B", "rendered B"))
+    for name in EXAMPLE_FORMS:
+        sizes = [retained_memory(make) for make in form_states(getattr(examples, name))]
+        print("%-10s %12.0f %12.0f %12.0f" % (name, *sizes))
+    print("python %s" % sys.version.split()[0])
+
+
+if __name__ == "__main__":
+    main()
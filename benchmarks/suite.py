@@ -0,0 +1,247 @@
+"""
+Benchmark suite for form construction, validation and rendering.
+
+    python -m benchmarks.suite                      # run and compare with baseline.json
+    python -m benchmarks.suite --save baseline.json # store new baseline
+    python -m benchmarks.suite -k as_div            # run only matching benchmarks
+
+Every benchmark reports operations per second, memory allocated by one operation
+(tracemalloc peak) and memory retained after it. Compared with the baseline,
+benchmarks slower than the tolerance are reported and the exit status is 1.
+Benchmarks without a baseline entry are listed as new and don't fail the run.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from . import setup
+
+setup()
+
+from django import forms  # noqa: E402
+from django.forms import formset_factory  # noqa: E402
+from django.template import Context, Template  # noqa: E402
+
+from styled_forms.decorators import bootstrap_style_form, semanticui_style_form, styled_form  # noqa: E402
+from styled_forms.forms import BootstrapForm, SemanticUIForm, StyledFormSet, examples, render_many  # noqa: E402
+from styled_forms.utils import create_style  # noqa: E402
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+EXAMPLE_FORMS = ["TestForm", "TestForm1", "TestForm2", "TestForm3", "TestForm4"]
+SIZES = [10, 100, 1000]
+
+
+def make_fields(size):
+    """Return dict of size fields with mixed widgets"""
+    fields = {}
+    for i in range(size):
+        kind = i % 5
+        if kind == 0:
+            field = forms.CharField(help_text="Help text %d" % i)
+        elif kind == 1:
+            field = forms.BooleanField(required=False)
+        elif kind == 2:
+            field = forms.ChoiceField(choices=[(str(c), "Choice %d" % c) for c in range(20)])
+        elif kind == 3:
+            field = forms.EmailField(required=False)
+        else:
+            field = forms.CharField(widget=forms.Textarea, required=False)
+        fields["field_%d" % i] = field
+    return fields
+
+
+def make_grid(names, per_row, width):
+    return [[(name, width) for name in names[i:i + per_row]] for i in range(0, len(names), per_row)]
+
+
+def make_form(base, size, grid=None):
+    """Build synthetic form class with size fields and optional grid"""
+    attrs = make_fields(size)
+    attrs["__module__"] = __name__
+    if grid is not None:
+        attrs["Style"] = type("Style", (), {"grid": grid(list(attrs)[:-1])})
+    return type("Synthetic%s%d" % (base.__name__, size), (base, forms.Form), attrs)
+
+
+def make_data(form_class):
+    """Return POST data with a valid value for every field"""
+    data = {}
+    for name, field in form_class.base_fields.items():
+        if isinstance(field, forms.BooleanField):
+            data[name] = "on"
+        elif isinstance(field, forms.ChoiceField):
+            data[name] = "1"
+        elif isinstance(field, forms.EmailField):
+            data[name] = "user@example.com"
+        else:
+            data[name] = "value"
+    return data
+
+
+def form_benchmarks(label, form_class, data):
+    yield "init %s" % label, lambda: form_class()
+
+    unbound = form_class()
+    yield "as_div unbound %s" % label, unbound.as_div
+
+    bound = form_class(data=data)
+    try:
+        bound.full_clean()
+    except Exception:
+        # Example forms with fields which can't be validated are only rendered
+        return
+    yield "full_clean %s" % label, lambda: form_class(data=data).full_clean()
+    yield "as_div bound %s" % label, bound.as_div
+
+
+def get_benchmarks():
+    for name in EXAMPLE_FORMS:
+        form_class = getattr(examples, name)
+        yield from form_benchmarks(name, form_class, make_data(form_class))
+
+    layouts = [
+        ("nogrid", BootstrapForm, None),
+        ("bootstrap", BootstrapForm, lambda names: make_grid(names, 3, 4)),
+        ("semanticui", SemanticUIForm, lambda names: make_grid(names, 2, 8)),
+    ]
+    for size in SIZES:
+        for layout, base, grid in layouts:
+            form_class = make_form(base, size, grid)
+            yield from form_benchmarks("%s %d" % (layout, size), form_class, make_data(form_class))
+
+    for layout, base, grid in layouts:
+        form_class = make_form(base, 10, grid)
+        formset = formset_factory(form_class, formset=StyledFormSet, extra=200)()
+        formset.forms
+        yield "formset 200 per form %s" % layout, lambda formset=formset: [form.as_div() for form in formset]
+        yield "formset 200 render_many %s" % layout, lambda formset=formset: render_many(formset.forms)
+
+    template = Template('{% load form_styles %}{{ form|custom_style:"bootstrap" }}')
+    plain_class = type("PlainForm", (forms.Form,), dict(make_fields(10), __module__=__name__))
+    plain = plain_class()
+    yield "custom_style filter", lambda: template.render(Context({"form": plain}))
+
+    decorators = [
+        ("styled_form", styled_form),
+        ("bootstrap_style_form", bootstrap_style_form),
+        ("semanticui_style_form", semanticui_style_form),
+        ("create_style", create_style(type("Style", (), {"style": "bootstrap"}))),
+    ]
+    for name, decorator in decorators:
+        yield "decorator %s cached" % name, lambda decorator=decorator: decorator(plain_class)
+
+    def new_class():
+        form_class = type("Fresh", (forms.Form,), dict(make_fields(10), __module__=__name__))
+        bootstrap_style_form(form_class)
+    yield "decorator new class", new_class
+
+
+def ops_per_second(func, min_time):
+    """Return best operations per second of three runs lasting at least min_time"""
+    func()
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / 3:
+            break
+        number *= 2
+    best = elapsed
+    for _ in range(2):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, time.perf_counter() - start)
+    return number / best
+
+
+def memory(func):
+    """Return bytes allocated at peak and retained by a single operation"""
+    func()
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    result = func()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak - start, current - start
+
+
+def run(pattern=None, min_time=0.3):
+    results = {}
+    for name, func in get_benchmarks():
+        if pattern and pattern not in name:
+            continue
+        peak, retained = memory(func)
+        results[name] = {
+            "ops": ops_per_second(func, min_time),
+            "peak": peak,
+            "retained": retained,
+        }
+        print("%-40s %12.1f ops/s %10d B peak %10d B retained" % (
+            name, results[name]["ops"], peak, retained
+        ), flush=True)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Print changes against the baseline, return names of regressed benchmarks.
+    Benchmarks missing in the baseline are reported, not compared.
+    """
+    regressions = []
+    missing = []
+    print()
+    print("%-40s %12s %12s %8s" % ("benchmark", "baseline", "current", "change"))
+    for name, result in results.items():
+        if name not in baseline:
+            missing.append(name)
+            print("%-40s %12s %12.1f %8s" % (name, "-", result["ops"], "new"))
+            continue
+        before = baseline[name]["ops"]
+        change = result["ops"] / before - 1
+        mark = ""
+        if change < -tolerance:
+            regressions.append(name)
+            mark = " REGRESSION"
+        print("%-40s %12.1f %12.1f %+7.1f%%%s" % (name, before, result["ops"], change * 100, mark))
+    if missing:
+        print("\n%d benchmarks have no baseline entry, record them with --save" % len(missing))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="pattern", help="run only benchmarks containing this text")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline JSON file to compare with")
+    parser.add_argument("--save", metavar="PATH", help="save results as a new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown against the baseline, default 0.25")
+    parser.add_argument("--min-time", type=float, default=0.3, help="seconds per benchmark")
+    args = parser.parse_args(argv)
+
+    results = run(args.pattern, args.min_time)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=1, sort_keys=True)
+        return 0
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\n%d benchmarks slower than the baseline" % len(regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,15 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class StyledFormsConfig(AppConfig):
     name = 'styled_forms'
+
+    def ready(self):
+        if getattr(settings, "STYLED_FORMS_SIGNALS", False):
+            from . import instrumentation
+            instrumentation.add_collector(instrumentation.SignalCollector())
+        theme_paths = getattr(settings, "STYLED_FORMS_THEMES", None)
+        if theme_paths:
+            from .themes import load_themes
+            load_themes(theme_paths, getattr(settings, "STYLED_FORMS_THEMES_CACHE", None))
@@ -0,0 +1,63 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from time import monotonic
+
+from django.core.cache import caches
+
+
+class FragmentCache:
+    """
+    Bounded LRU cache of rendered form html with optional time to live.
+    When backend is set, Django cache with that alias is used as the second tier
+    shared between processes.
+    """
+    def __init__(self, max_size=128, ttl=None, backend=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.backend = backend
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        """Return cached html or None"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                value, expires = item
+                if expires is None or expires > monotonic():
+                    self._data.move_to_end(key)
+                    return value
+                del self._data[key]
+        if self.backend is not None:
+            value = caches[self.backend].get(key)
+            if value is not None:
+                self._store(key, value)
+                return value
+        return None
+
+    def set(self, key, value):
+        self._store(key, value)
+        if self.backend is not None:
+            caches[self.backend].set(key, value, self.ttl)
+
+    def _store(self, key, value):
+        expires = monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def make_key(*parts):
+    """Return stable cache key for the parts, same in every process"""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return "styled_forms:%s" % digest
@@ -0,0 +1,164 @@
+"""
+Cache of rendered <option> markup of select widgets.
+
+Enabled with Style.choice_cache. The options of a select are rendered once
+without selection and stored per form class, field and choices version,
+the selected state of the current value is spliced in on every render.
+The select tag itself is rendered as usual, so ids, classes and aria
+attributes still come from the bound field.
+
+Choices version is computed from the choices themselves for static choices,
+from the SQL of the queryset and the model version for model choice fields,
+and from the field version for callable choices. Versions are bumped with
+bump_version, for example when the queryset data change::
+
+    from styled_forms import choices
+
+    choices.bump_on_save(Country)
+    choices.bump_version(ProductForm, "sku")
+
+Versions are kept in the process, use Style.choice_cache_ttl to limit
+how long other processes use options of changed data.
+"""
+import threading
+
+from django.core.exceptions import EmptyResultSet
+from django.db.models.signals import post_delete, post_save
+from django.forms.widgets import ChoiceWidget, Select, Widget
+from django.utils.html import escape, mark_safe
+from django.utils.translation import get_language
+
+from .cache import make_key
+
+versions = {}
+_lock = threading.Lock()
+
+
+def bump_version(*key):
+    """
+    Invalidate cached options. Key is a model class, a form class and field
+    name, or nothing to invalidate all cached options.
+    """
+    with _lock:
+        versions[key] = versions.get(key, 0) + 1
+
+
+def get_version(*key):
+    return versions.get(key, 0)
+
+
+def bump_on_save(model):
+    """Bump version of the model whenever its instances are saved or deleted"""
+    def receiver(sender, **kwargs):
+        bump_version(model)
+    post_save.connect(receiver, sender=model, weak=False, dispatch_uid=("styled_forms.choices", model))
+    post_delete.connect(receiver, sender=model, weak=False, dispatch_uid=("styled_forms.choices", model))
+
+
+def is_cacheable(widget):
+    """Return True for select widgets rendered by the default option code and templates"""
+    cls = type(widget)
+    return (
+        isinstance(widget, Select)
+        and cls.get_context is Select.get_context
+        and cls.optgroups is ChoiceWidget.optgroups
+        and cls.create_option is ChoiceWidget.create_option
+        and cls.render is Widget.render
+        and widget.template_name == Select.template_name
+        and widget.option_template_name == Select.option_template_name
+    )
+
+
+def choices_state(choices):
+    """Return values and labels of static choices as strings, optgroups included"""
+    state = []
+    for value, label in choices:
+        if isinstance(label, (list, tuple)):
+            state.append((str(value), choices_state(label)))
+        else:
+            state.append((str(value), str(label)))
+    return state
+
+
+def get_choices_key(form, name, field):
+    """Return cache key of the field options, or None if they can't be cached"""
+    widget = field.widget
+    if not is_cacheable(widget):
+        return None
+    cls = form.__class__
+    parts = [
+        cls.__module__, cls.__qualname__, name, type(widget).__qualname__,
+        get_language(), get_version(), get_version(cls, name),
+    ]
+    queryset = getattr(field, "queryset", None)
+    if queryset is not None:
+        try:
+            sql = str(queryset.query)
+        except EmptyResultSet:
+            return None
+        parts += [
+            type(field).__qualname__, queryset.model._meta.label, sql,
+            get_version(queryset.model), field.empty_label,
+        ]
+    elif isinstance(widget.choices, (list, tuple)):
+        parts.append(choices_state(widget.choices))
+    return make_key(*parts)
+
+
+def select_options(body, values, multiple):
+    """Return option markup with the options of values selected, None if it can't be spliced"""
+    if not isinstance(values, (list, tuple)):
+        values = [values]
+    if len(values) > 1 and not multiple:
+        return None
+    for value in values:
+        option = '<option value="%s">' % escape(value)
+        body = body.replace(option, option[:-1] + ' selected>', -1 if multiple else 1)
+    return body
+
+
+class CachedOptionsWidget:
+    """
+    Stands in for the select widget in BoundField.as_widget, renders the
+    select tag with the template and options from the cache.
+    """
+    def __init__(self, widget, cache, key):
+        self.widget = widget
+        self.cache = cache
+        self.key = key
+
+    def __getattr__(self, name):
+        return getattr(self.widget, name)
+
+    def render(self, name, value, attrs=None, renderer=None):
+        widget = self.widget
+        context = Widget.get_context(widget, name, value, attrs)
+        context["widget"]["optgroups"] = []
+        if widget.allow_multiple_selected:
+            context["widget"]["attrs"]["multiple"] = True
+        shell = widget._render(widget.template_name, context, renderer)
+        end = shell.rfind("\n")
+        head, tail = shell[:end], shell[end:]
+
+        body = self.cache.get(self.key)
+        if body is None:
+            # Options without selection
+            context = widget.get_context(name, value, attrs)
+            context["widget"]["optgroups"] = widget.optgroups(name, [], attrs)
+            html = widget._render(widget.template_name, context, renderer)
+            if end < 0 or not html.startswith(head) or not html.endswith(tail):
+                return widget.render(name, value, attrs, renderer)
+            body = html[len(head):len(html) - len(tail)]
+            self.cache.set(self.key, body)
+        options = select_options(body, context["widget"]["value"], widget.allow_multiple_selected)
+        if options is None:
+            return widget.render(name, value, attrs, renderer)
+        return mark_safe(head + options + tail)
+
+
+def render_field(form, bf, cache):
+    """Return html of the bound field select with cached options, or None if it isn't cacheable"""
+    key = get_choices_key(form, bf.name, bf.field)
+    if key is None:
+        return None
+    return bf.as_widget(widget=CachedOptionsWidget(bf.field.widget, cache, key))
@@ -1,28 +1,35 @@
 from django.core.exceptions import ValidationError
-from .forms.forms import StyledForm
+from .forms.forms import StyledForm, styled_class
+
+
+def add_css_class(attrs, css_class):
+    """Add css class to widget attrs unless it is already there"""
+    classes = attrs.get('class', '').split()
+    if css_class not in classes:
+        classes.append(css_class)
+    attrs['class'] = " ".join(classes)
 
 
 def bootstrap_validation(function):
     """
     Add "is-valid" or "is-invalid" css class to the field.
+    Styled forms mark their inputs during validation, so the classes are added
+    only to the plain django forms.
     """
 
     def _validation(*args, **kwargs):
         field_name = function.__name__.split("_")[1]
         form = args[0]
+        styled = isinstance(form, StyledForm)
         try:
             result = function(*args, **kwargs)
-            try:
-                form.fields[field_name].widget.attrs['class'] += " is-valid"
-            except KeyError:
-                form.fields[field_name].widget.attrs['class'] = "is-invalid"
+            if not styled:
+                add_css_class(form.fields[field_name].widget.attrs, "is-valid")
             return result
 
         except ValidationError as e:
-            try:
-                form.fields[field_name].widget.attrs['class'] += " is-invalid"
-            except KeyError:
-                form.fields[field_name].widget.attrs['class'] = "is-invalid"
+            if not styled:
+                add_css_class(form.fields[field_name].widget.attrs, "is-invalid")
             raise ValidationError(e)
 
     return _validation
@@ -33,8 +40,7 @@ def styled_form(Cls):
     Class decorator.
     Change Cls form class to StyledForm.
     """
-    NewCls = type("NewCls", (StyledForm, Cls), {})
-    return NewCls
+    return styled_class(Cls)
 
 
 def bootstrap_style_form(Cls):
@@ -42,16 +48,7 @@ def bootstrap_style_form(Cls):
     Class decorator.
     Change Cls form class to StyledForm with Bootstrap classes.
     """
-    if hasattr(Cls, "Style"):
-        props = dict(Cls.Style.__dict__)
-        props['style'] = "bootstrap"
-        NewStyle = type("NewStyle", (), props)
-
-    else:
-        class NewStyle:
-            style = "bootstrap"
-    NewCls = type("NewCls", (StyledForm, Cls), {"Style": NewStyle})
-    return NewCls
+    return styled_class(Cls, style_name="bootstrap")
 
 
 def semanticui_style_form(Cls):
@@ -59,14 +56,4 @@ def semanticui_style_form(Cls):
     Class decorator.
     Change Cls form class to StyledForm with Semantic UI classes.
     """
-    if hasattr(Cls, "Style"):
-        props = dict(Cls.Style.__dict__)
-        props['style'] = "semanticui"
-        NewStyle = type("NewStyle", (), props)
-
-    else:
-        class NewStyle:
-            style = "semanticui"
-    NewCls = type("NewCls", (StyledForm, Cls), {"Style": NewStyle})
-    return NewCls
-
+    return styled_class(Cls, style_name="semanticui")
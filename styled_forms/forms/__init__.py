@@ -1,5 +1,7 @@
 from .forms import (
     StyledForm,
     BootstrapForm,
-    SemanticUIForm
-)
\ No newline at end of file
+    SemanticUIForm,
+    render_many,
+)
+from .formsets import StyledFormSet
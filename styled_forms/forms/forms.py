@@ -1,10 +1,72 @@
-from ..styles import BootstrapStyle, SemanticUIUIStyle, Style, styles
-from django.forms import FileField
+from .. import choices, instrumentation
+from ..cache import make_key
+from ..styles import (
+    ROW_VALUES, BootstrapStyle, SemanticUIUIStyle, FieldValues, Grid, Style, CssClasses, drop_classes,
+    get_input_classes, join_classes, merge_styles, split_classes, styles,
+)
+import asyncio
+import atexit
+import copy
+import inspect
+import threading
+import warnings
+from functools import partial
+from time import perf_counter
+import weakref
+from asgiref.sync import sync_to_async
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from django.forms import BaseForm, FileField
+from django.forms.boundfield import BoundField
+from django.forms.utils import ErrorDict
 from django.forms.widgets import CheckboxInput, RadioSelect
 from django.forms import widgets
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from types import MethodType
+from django.db import close_old_connections
+from django.utils.datastructures import MultiValueDict
+from django.utils import timezone
 from django.utils.html import conditional_escape, mark_safe
+from django.utils.translation import get_language
+
+NORMAL = "normal"
+CHECKBOX = "checkbox"
+FILE = "file"
+RADIO = "radio"
+HIDDEN = "hidden"
+
+# Style css class of the input for each widget kind
+input_classes = {CHECKBOX: "input_checkbox", FILE: "input_file"}
+
+
+def widget_kind(widget):
+    """Return kind of the widget which decides input css class and row template"""
+    if isinstance(widget, CheckboxInput):
+        return CHECKBOX
+    if isinstance(widget, widgets.FileInput):
+        return FILE
+    if isinstance(widget, RadioSelect):
+        return RADIO
+    if widget.is_hidden:
+        return HIDDEN
+    return NORMAL
+
+
+class FieldLayout:
+    """
+    Field names of the form class with their positions, widget classes and kinds,
+    computed once per form class from base_fields.
+    """
+    __slots__ = ("names", "positions", "widget_classes", "kinds")
+
+    def __init__(self, fields):
+        self.names = tuple(fields)
+        self.positions = {name: i for i, name in enumerate(self.names)}
+        self.widget_classes = tuple(field.widget.__class__ for field in fields.values())
+        self.kinds = tuple(widget_kind(field.widget) for field in fields.values())
+
+
+class UnplacedFieldsWarning(UserWarning):
+    """Visible fields of the form are left out of the grid layout"""
 
 
 class StyledForm:
@@ -14,55 +76,162 @@ class StyledForm:
     Added the as_div method which is used as default in __str__.
     Property style holds all styling classes and display methods.
     """
+    style_name = None
+    # error of fields which were not cleaned in Style.parallel_clean_timeout
+    clean_timeout_message = "Validation timed out."
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        start = instrumentation.start()
+        self.apply_style(self.get_style())
+        if start is not None:
+            instrumentation.record(self, instrumentation.STYLE, start, len(self.fields))
 
-        user_style = getattr(self, "Style", None)
-        if user_style is not None:
-            s = getattr(self.Style, "style", None)
-            if s is not None:
-                style = styles.get_style(s)
-                if style is not None:
-                    props = dict(style.__dict__)
-                    for key, value in dict(user_style.__dict__).items():
-                        props[key] = value
-                    new_Style = type("NewStyle", (), props)
-                    self.style = Style(style=new_Style)
-                else:
-                    raise Exception("Style '%s' not found" % s)
-            else:
-                self.style = Style(style=user_style)
-        else:
-            self.style = Style(style=user_style)
+    def apply_style(self, style):
+        """Attach resolved style to the form and set css classes of the inputs"""
+        self.style = style
+        self.css_classes = CssClasses(style.css_classes)
 
         if not hasattr(self, "input_valid_cssclass"):
-            self.input_valid_cssclass = self.style.css_classes["valid_input"]
+            self.input_valid_cssclass = self.css_classes["valid_input"]
 
         if not hasattr(self, "input_invalid_cssclass"):
-            self.input_invalid_cssclass = self.style.css_classes["invalid_input"]
+            self.input_invalid_cssclass = self.css_classes["invalid_input"]
 
         # Set css classes to the inputs
+        self.input_classes = FieldValues(self.get_field_positions())
         for name, field in self.fields.items():
-            if isinstance(field.widget, CheckboxInput):
-                try:
-                    field.widget.attrs['class'] += " %s" % self.style.css_classes["input_checkbox"]
-                except KeyError:
-                    field.widget.attrs['class'] = self.style.css_classes["input_checkbox"]
-            elif isinstance(field.widget, widgets.FileInput) or isinstance(field.widget, widgets.ClearableFileInput):
-                try:
-                    field.widget.attrs['class'] += " %s" % self.style.css_classes["input_file"]
-                except KeyError:
-                    field.widget.attrs['class'] = self.style.css_classes["input_file"]
-            else:
-                try:
-                    field.widget.attrs['class'] += " %s" % self.style.css_classes["input"]
-                except KeyError:
-                    field.widget.attrs['class'] = self.style.css_classes["input"]
+            self.update_input_class(name, field)
+
+    def get_input_classes(self, name, field):
+        """Return InputClasses of the field, created from widget and style classes"""
+        classes = self.input_classes.get(name)
+        if classes is None:
+            classes = self.input_classes[name] = self.read_input_classes(name, field)
+        return classes
+
+    def read_input_classes(self, name, field):
+        """
+        Return InputClasses of the current widget class attribute without
+        validation state, so classes added after the form was created are kept
+        """
+        kind = self.get_widget_kind(name, field)
+        return get_input_classes(drop_classes(
+            split_classes(field.widget.attrs.get('class'), self.css_classes[input_classes.get(kind, "input")]),
+            split_classes(self.input_valid_cssclass, self.input_invalid_cssclass),
+        ))
+
+    def set_input_valid(self, name, valid):
+        """Mark the input as valid or invalid"""
+        field = self.fields[name]
+        classes = self.get_input_classes(name, field)
+        valid_class, invalid_class = self.input_valid_cssclass, self.input_invalid_cssclass
+        if (field.widget.attrs.get('class') or '') != classes.join(valid_class, invalid_class):
+            # Class attribute was changed after it was written
+            classes = self.read_input_classes(name, field)
+        self.input_classes[name] = classes.set_valid(valid)
+        self.update_input_class(name, field)
+
+    def update_input_class(self, name, field):
+        """Write joined css classes to the widget class attribute"""
+        value = self.get_input_classes(name, field).join(
+            self.input_valid_cssclass, self.input_invalid_cssclass
+        )
+        if value:
+            field.widget.attrs['class'] = value
+        else:
+            field.widget.attrs.pop('class', None)
 
-        # Override methods
-        self._clean_fields = MethodType(StyledForm._clean_fields, self)
-        self.is_valid = MethodType(StyledForm.is_valid, self)
-        self._html_output = MethodType(StyledForm._html_output, self)
+    @classmethod
+    def get_field_layout(cls):
+        """Return FieldLayout of base_fields, computed once per form class"""
+        layout = cls.__dict__.get("_field_layout")
+        if layout is None:
+            cls.check_fields(cls.get_style())
+            layout = cls._field_layout = FieldLayout(cls.base_fields)
+        return layout
+
+    def get_field_positions(self):
+        """
+        Return mapping of field name to position. Forms with fields of the class
+        layout share its positions, other forms get positions of their fields.
+        """
+        layout = self.get_field_layout()
+        if tuple(self.fields) == layout.names:
+            return layout.positions
+        return {name: i for i, name in enumerate(self.fields)}
+
+    def get_widget_kind(self, name, field):
+        """
+        Return widget kind from the class layout. Fields added on the instance
+        or with replaced widget are classified again.
+        """
+        layout = self.get_field_layout()
+        index = layout.positions.get(name)
+        if index is not None and layout.widget_classes[index] is field.widget.__class__:
+            return layout.kinds[index]
+        return widget_kind(field.widget)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.check_style()
+
+    @classmethod
+    def check_style(cls):
+        """
+        Resolve the style when the form class is defined, so grid layout errors
+        (wrong width) are raised at class definition. Styles registered later
+        are checked at first instantiation. Field names are checked by check_fields.
+        """
+        if not issubclass(cls, BaseForm):
+            return
+        name = cls.style_name
+        if name is None:
+            name = getattr(getattr(cls, "Style", None), "style", None)
+        if name is not None and styles.get_style(name) is None:
+            return
+        cls.get_style()
+
+    @classmethod
+    def check_fields(cls, style):
+        """
+        Check grid field names against base_fields. Called once per form class
+        with its field layout, because base_fields are set by the form metaclass
+        after the class is created and model form fields aren't declared fields.
+        """
+        if style.grid_plan is None:
+            return
+        fields = cls.base_fields
+        if style.check_grid_fields:
+            for name in style.get_grid_fields():
+                if name not in fields:
+                    raise ValueError(
+                        "Grid field '%s' is not a field of %s, set Style.check_grid_fields = False"
+                        " if it is added in __init__" % (name, cls.__name__)
+                    )
+        if style.unplaced_fields == "report":
+            unplaced = [
+                name for name, field in fields.items()
+                if name not in style.grid_fields and not field.widget.is_hidden
+            ]
+            if unplaced:
+                warnings.warn(
+                    "Fields %s of %s are not in the grid layout" % (", ".join(unplaced), cls.__name__),
+                    UnplacedFieldsWarning,
+                    # form instantiation, through get_field_layout and apply_style
+                    stacklevel=6,
+                )
+
+    @classmethod
+    def get_style(cls):
+        """
+        Return resolved style for this form class. The style name is taken from
+        style_name or Style.style attribute.
+        """
+        name = cls.style_name
+        if name is None:
+            name = getattr(getattr(cls, "Style", None), "style", None)
+        return styles.resolve(cls, name)
 
     def __str__(self):
         return self.as_div()
@@ -72,148 +241,819 @@ class StyledForm:
         Return True if the form has no errors, or False otherwise.
         Sets additional form validation style classes.
         """
-        self.style.css_classes['form'] += " " + self.style.css_classes['validated_form']
         valid = self.is_bound and not self.errors
-        if valid:
-            self.style.css_classes['form'] += " " + self.style.css_classes['valid_form']
-        else:
-            self.style.css_classes['form'] += " " + self.style.css_classes['invalid_form']
+        base = self.style.css_classes
+        self.css_classes['form'] = join_classes(
+            base['form'],
+            base['validated_form'],
+            base['valid_form'] if valid else base['invalid_form'],
+        )
         return valid
 
+    def get_form_class(self):
+        """Return form css classes including validation state"""
+        return self.css_classes['form']
+
     def _clean_fields(self):
         """
         The only difference from django.form.Form._clean_fields is adding css classes to the fields.
         """
+        start = instrumentation.start()
+        if self.style.parallel_clean:
+            self._clean_fields_parallel()
+        else:
+            for name, field in self.fields.items():
+                if self._clean_field(name, field) and hasattr(self, 'clean_%s' % name):
+                    self._run_clean_hook(name, getattr(self, 'clean_%s' % name))
+        if start is not None:
+            instrumentation.record(self, instrumentation.CLEAN, start, len(self.fields))
+
+    def _get_clean_value(self, name, field):
+        """Return cleaned value of the field, raise ValidationError if it isn't valid"""
+        if field.disabled:
+            value = self.get_initial_for_field(field, name)
+        else:
+            value = field.widget.value_from_datadict(self.data, self.files, self.add_prefix(name))
+        if isinstance(field, FileField):
+            initial = self.get_initial_for_field(field, name)
+            return field.clean(value, initial)
+        return field.clean(value)
+
+    def _add_field_error(self, name, error):
+        """Add error of the field and mark its input invalid"""
+        self.add_error(name, error)
+        self.set_input_valid(name, False)
+
+    def _clean_field(self, name, field):
+        """Clean the field value, return True if it is valid"""
+        try:
+            value = self._get_clean_value(name, field)
+        except ValidationError as e:
+            self._add_field_error(name, e)
+            return False
+        self.cleaned_data[name] = value
+        self.set_input_valid(name, True)
+        return True
+
+    def _clean_field_in_worker(self, name, field, cleaned_data):
+        """Clean the field and call its clean_<field> method, run in the pool thread"""
+        cleaned_data[name] = self._get_clean_value(name, field)
+        if hasattr(self, 'clean_%s' % name):
+            return self._call_clean_hook(name, getattr(self, 'clean_%s' % name))
+        return cleaned_data[name]
+
+    def _clean_fields_parallel(self):
+        """
+        Clean fields and call clean_<field> methods on the shared thread pool.
+        Style.parallel_clean is True for all fields or a list of field names,
+        the other fields are cleaned before in this thread. Fields which find
+        no free worker are cleaned in this thread too. Results are merged
+        in field order after all cleaners finished or the timeout passed.
+        """
+        style = self.style
+        parallel = style.parallel_clean
+        names = self.fields if parallel is True else parallel
         for name, field in self.fields.items():
-            if field.disabled:
-                value = self.get_initial_for_field(field, name)
+            if name not in names:
+                if self._clean_field(name, field) and hasattr(self, 'clean_%s' % name):
+                    self._run_clean_hook(name, getattr(self, 'clean_%s' % name))
+
+        working = self.cleaned_data
+        timeout = style.parallel_clean_timeout
+        deadline = perf_counter() + timeout if timeout is not None else None
+        futures = [
+            (name, field, clean_pool.submit(
+                self.__class__, style.parallel_clean_workers, self._clean_field_in_worker, name, field, working
+            ))
+            for name, field in self.fields.items() if name in names
+        ]
+        for index, (name, field, future) in enumerate(futures):
+            if future is None:
+                # All workers are busy
+                future = Future()
+                try:
+                    future.set_result(self._clean_field_in_worker(name, field, working))
+                except Exception as e:
+                    future.set_exception(e)
+                futures[index] = (name, field, future)
+        if deadline is not None:
+            timeout = max(deadline - perf_counter(), 0)
+        wait([future for name, field, future in futures], timeout=timeout)
+
+        results = {}
+        errors = []
+        for name, field, future in futures:
+            if not future.done():
+                future.cancel()
+                errors.append((name, ValidationError(self.clean_timeout_message, code="timeout")))
+                continue
+            error = future.exception()
+            if error is None:
+                results[name] = future.result()
+            elif isinstance(error, ValidationError):
+                errors.append((name, error))
             else:
-                value = field.widget.value_from_datadict(self.data, self.files, self.add_prefix(name))
-            try:
-                if isinstance(field, FileField):
-                    initial = self.get_initial_for_field(field, name)
-                    value = field.clean(value, initial)
+                raise error
+        # Cleaners which are still running write to the working dict only
+        self.cleaned_data = {
+            name: results[name] if name in names else working[name]
+            for name in self.fields
+            if name in results or (name not in names and name in working)
+        }
+        for name in results:
+            self.set_input_valid(name, True)
+        for name, error in errors:
+            self._add_field_error(name, error)
+
+    def _call_clean_hook(self, name, hook):
+        """Return result of sync clean_<field> method, async ones are refused"""
+        message = "%s.clean_%s is async, validate the form with ais_valid()" % (self.__class__.__name__, name)
+        if inspect.iscoroutinefunction(hook):
+            raise TypeError(message)
+        value = hook()
+        if inspect.isawaitable(value):
+            if inspect.iscoroutine(value):
+                value.close()
+            raise TypeError(message)
+        return value
+
+    def _run_clean_hook(self, name, hook):
+        try:
+            self.cleaned_data[name] = self._call_clean_hook(name, hook)
+        except ValidationError as e:
+            self._add_field_error(name, e)
+
+    async def ais_valid(self, concurrency=None):
+        """
+        Async version of is_valid. Async clean_<field> methods run concurrently,
+        at most concurrency (default Style.clean_concurrency) of them at once.
+        """
+        if self._errors is None:
+            await self.afull_clean(concurrency)
+        return self.is_valid()
+
+    async def afull_clean(self, concurrency=None):
+        """
+        Async version of full_clean. Fields are cleaned and sync clean_<field> methods
+        are called in order, async ones are awaited after all fields were cleaned.
+        Their results are applied in field order, then clean() and _post_clean() run.
+        Sync steps run through sync_to_async, so they can use the ORM.
+        """
+        errors = ErrorDict()
+        if hasattr(self, "renderer"):
+            errors.renderer = self.renderer
+        self._errors = errors
+        if not self.is_bound:
+            return
+        self.cleaned_data = {}
+        if self.empty_permitted and not await sync_to_async(self.has_changed)():
+            return
+        await self._aclean_fields(concurrency or self.style.clean_concurrency)
+        await sync_to_async(self._clean_form)()
+        await sync_to_async(self._post_clean)()
+
+    def _clean_fields_before_hooks(self):
+        """Clean fields and call sync clean_<field> methods, return async ones"""
+        hooks = []
+        for name, field in self.fields.items():
+            if self._clean_field(name, field) and hasattr(self, 'clean_%s' % name):
+                hook = getattr(self, 'clean_%s' % name)
+                if inspect.iscoroutinefunction(hook):
+                    hooks.append((name, hook))
                 else:
-                    value = field.clean(value)
-                self.cleaned_data[name] = value
-                if hasattr(self, 'clean_%s' % name):
-                    value = getattr(self, 'clean_%s' % name)()
+                    self._run_clean_hook(name, hook)
+        return hooks
+
+    async def _aclean_fields(self, concurrency):
+        start = instrumentation.start()
+        hooks = await sync_to_async(self._clean_fields_before_hooks)()
+        if hooks:
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def run(hook):
+                async with semaphore:
+                    try:
+                        return await hook(), None
+                    except ValidationError as e:
+                        return None, e
+
+            results = await asyncio.gather(*(run(hook) for name, hook in hooks))
+            failed = False
+            for (name, hook), (value, error) in zip(hooks, results):
+                if error is None:
                     self.cleaned_data[name] = value
-                field.widget.attrs['class'] += " %s" % self.input_valid_cssclass
-            except ValidationError as e:
-                self.add_error(name, e)
-                field.widget.attrs['class'] += " %s" % self.input_invalid_cssclass
+                else:
+                    self._add_field_error(name, error)
+                    failed = True
+            if failed:
+                # Errors of the async methods are added last, keep them in field order like full_clean
+                order = {name: i for i, name in enumerate(self.fields)}
+                items = sorted(self._errors.items(), key=lambda item: order.get(item[0], len(order)))
+                self._errors.clear()
+                self._errors.update(items)
+        if start is not None:
+            instrumentation.record(self, instrumentation.CLEAN, start, len(self.fields))
 
     def _html_output(self, normal_row, special_rows, error_row, row_ender, help_text_html, errors_on_separate_row):
         """Output HTML. Used by as_table(), as_ul(), as_p(), as_div()."""
-        top_errors = self.non_field_errors().copy()
-        output = self.style.grid
-        hidden_fields = []
+        return mark_safe(''.join(self._iter_html_output(
+            normal_row, special_rows, error_row, row_ender, help_text_html, errors_on_separate_row
+        )))
+
+    def _iter_html_output(self, normal_row, special_rows, error_row, row_ender, help_text_html,
+                          errors_on_separate_row):
+        """Yield HTML in chunks, fields are rendered when the grid reaches them."""
+        start = instrumentation.start()
+        output = self.style.get_grid()
+        renderer = FieldRenderer(
+            self, output, normal_row, special_rows, error_row, help_text_html, errors_on_separate_row
+        )
+        if type(output).get_html is not Grid.get_html:
+            # Grid with custom get_html reads rendered fields directly
+            renderer.render_all()
+            yield output.get_html()
+        else:
+            output.renderer = renderer
+            yield from output.iter_html()
+        if start is not None:
+            renderer.record(start)
 
+    def get_fragment_cache_key(self):
+        """
+        Return key of the rendered form in the style fragment cache or None
+        if the form can't be cached. Bound forms, forms with changed field set
+        and fields with queryset or callable choices bypass the cache.
+        Active language, format settings and time zone are part of the key.
+        """
+        if self.is_bound or self.fields.keys() != self.base_fields.keys():
+            return None
+        state = []
         for name, field in self.fields.items():
-            html_class_attr = ''
-            bf = self[name]
-            bf_errors = self.error_class(bf.errors).as_text()
-            if bf.is_hidden:
-                if bf_errors:
-                    top_errors.extend(
-                        ['(Hidden field %(name)s) %(error)s' % {'name': name, 'error': str(e)}
-                         for e in bf_errors.splitlines(keepends=False)])
-                hidden_fields.append(str(bf))
+            choices = getattr(field, "choices", None)
+            if choices is not None:
+                if hasattr(field, "queryset") or not isinstance(choices, (list, tuple)):
+                    return None
+            widget = field.widget
+            state.append((
+                name,
+                self.get_initial_for_field(field, name),
+                field.label,
+                field.help_text,
+                field.required,
+                field.disabled,
+                widget.__class__.__module__,
+                widget.__class__.__qualname__,
+                getattr(widget, "input_type", None),
+                widget.is_hidden,
+                widget.attrs,
+                choices,
+            ))
+        cls = self.__class__
+        return make_key(
+            cls.__module__, cls.__qualname__, self.style.fingerprint,
+            self.prefix, self.auto_id, self.use_required_attribute,
+            self.renderer.__class__.__module__, self.renderer.__class__.__qualname__,
+            get_language(), settings.FORMAT_MODULE_PATH, settings.USE_THOUSAND_SEPARATOR,
+            timezone.get_current_timezone_name(), state,
+        )
+
+    def get_div_options(self):
+        """Return _html_output arguments used by as_div"""
+        return {
+            "normal_row": self.style.rows["normal"],
+            "special_rows": self.style.rows,
+            "error_row": self.style.rows["error"],
+            "row_ender": '</div>',
+            "help_text_html": ' <small class="form-text text-muted">%s</small>',
+            "errors_on_separate_row": self.style.errors_on_separate_row,
+        }
+
+    def iter_html(self):
+        """
+        Yield form html in safe chunks, one per grid row, as soon as the row is rendered.
+        Output joined together is the same as as_div, so it can be passed to
+        StreamingHttpResponse or iterated in a template.
+        """
+        fragments = self.style.fragments
+        key = self.get_fragment_cache_key() if fragments is not None else None
+        if key is not None:
+            html = fragments.get(key)
+            if html is not None:
+                yield mark_safe(html)
+                return
+        chunks = []
+        for chunk in self._iter_html_output(**self.get_div_options()):
+            if key is not None:
+                chunks.append(chunk)
+            yield mark_safe(chunk)
+        if key is not None:
+            fragments.set(key, ''.join(chunks))
+
+    def as_div(self):
+        fragments = self.style.fragments
+        if fragments is not None:
+            key = self.get_fragment_cache_key()
+            if key is not None:
+                html = fragments.get(key)
+                if html is None:
+                    html = self.render_div()
+                    fragments.set(key, str(html))
+                return mark_safe(html)
+        return self.render_div()
+
+    def render_div(self):
+        """Render form without the fragment cache"""
+        return self._html_output(**self.get_div_options())
+
+    def render_field_row(self, name):
+        """
+        Return html of the field row, wrapped in the grid column like in as_div.
+        When the bound form wasn't validated yet, only this field is cleaned with
+        its clean_<field> method for the render, form clean() is not called.
+        The form is left unvalidated afterwards, so is_valid() runs full_clean.
+        """
+        field = self.fields[name]
+        if self._errors is not None:
+            return self._render_field_row(name, field)
+        self._errors = ErrorDict()
+        if hasattr(self, "renderer"):
+            self._errors.renderer = self.renderer
+        self.cleaned_data = {}
+        try:
+            if self.is_bound and self._clean_field(name, field) and hasattr(self, 'clean_%s' % name):
+                self._run_clean_hook(name, getattr(self, 'clean_%s' % name))
+            return self._render_field_row(name, field)
+        finally:
+            self._errors = None
+            del self.cleaned_data
+            self.input_classes[name] = self.get_input_classes(name, field).set_valid(None)
+            self.update_input_class(name, field)
+
+    def _render_field_row(self, name, field):
+        grid = self.get_row_grid()
+        if self.get_widget_kind(name, field) == HIDDEN:
+            grid.renderer.render(name)
+            return mark_safe(''.join(grid.renderer.hidden_fields))
+        return mark_safe(self._render_row(grid, name))
+
+    def get_row_grid(self):
+        """Return grid with field renderer of the form, used to render single rows"""
+        options = self.get_div_options()
+        grid = self.style.get_grid()
+        grid.renderer = FieldRenderer(
+            self,
+            grid,
+            options["normal_row"],
+            options["special_rows"],
+            options["error_row"],
+            options["help_text_html"],
+            options["errors_on_separate_row"],
+        )
+        return grid
+
+    def _render_row(self, grid, name):
+        plan = self.style.get_field_plan(name)
+        if plan is None:
+            return ''.join(grid.iter_field(name))
+        return ''.join(grid.iter_plan(plan))
+
+    def render_rows(self):
+        """
+        Return dict of visible field names to html of their rows, wrapped
+        in grid columns like in as_div. Bound form is validated first.
+        """
+        grid = self.get_row_grid()
+        return {name: mark_safe(self._render_row(grid, name)) for name in grid.renderer.visible_names()}
+
+    def render_unbound_rows(self):
+        """
+        Return rows of the form rendered as if it was not bound. Rows are kept
+        in the style fragment cache, when the style has one and the form can be cached.
+        """
+        form = copy.copy(self)
+        form.is_bound = False
+        form.data = MultiValueDict()
+        form.files = MultiValueDict()
+        form._errors = None
+        form._bound_fields_cache = {}
+        form.__dict__.pop("cleaned_data", None)
+        form.css_classes = CssClasses(self.style.css_classes)
+        # Fields are shared with this form, their inputs get classes without validation state for a while
+        form.input_classes = FieldValues(self.input_classes.positions)
+        try:
+            for name, field in form.fields.items():
+                form.input_classes[name] = self.get_input_classes(name, field).set_valid(None)
+                form.update_input_class(name, field)
+            fragments = self.style.fragments
+            key = form.get_fragment_cache_key() if fragments is not None else None
+            if key is not None:
+                key += ":rows"
+                rows = fragments.get(key)
+                if rows is not None:
+                    return {name: mark_safe(html) for name, html in rows.items()}
+            rows = form.render_rows()
+            if key is not None:
+                fragments.set(key, {name: str(html) for name, html in rows.items()})
+            return rows
+        finally:
+            for name, field in self.fields.items():
+                self.update_input_class(name, field)
+
+    def render_changed_rows(self, previous=None):
+        """
+        Return rows of visible fields changed by validation, e.g. for partial
+        page updates after a failed POST. By default rows are compared with the
+        form showing the submitted values without errors, leaving the valid input
+        class out, so only rows with errors count as changed. Rows returned by
+        render_rows() of an earlier response are compared as they are.
+        """
+        rows = self.render_rows()
+        if previous is not None:
+            return {name: html for name, html in rows.items() if previous.get(name) != html}
+        submitted = self._render_submitted_rows(ErrorDict())
+        compared = self._render_submitted_rows(self.errors)
+        return {name: rows[name] for name, html in compared.items() if submitted.get(name) != html}
+
+    def _render_submitted_rows(self, errors):
+        """Return rows of the bound form with the errors, only inputs with errors get validation class"""
+        form = copy.copy(self)
+        form._errors = errors
+        form._bound_fields_cache = {}
+        # Fields are shared with this form, their inputs get classes without valid state for a while
+        form.input_classes = FieldValues(self.input_classes.positions)
+        try:
+            for name, field in form.fields.items():
+                form.input_classes[name] = self.get_input_classes(name, field).set_valid(
+                    False if name in errors else None
+                )
+                form.update_input_class(name, field)
+            return form.render_rows()
+        finally:
+            for name, field in self.fields.items():
+                self.update_input_class(name, field)
+
+
+class FieldRenderer:
+    """
+    Renders rows of the form fields on demand and stores them in the grid.
+    Hidden fields are rendered together, when the grid asks for them or all
+    visible fields were rendered, because their errors go to the top errors.
+    Resets the grid to rendered values addressed by the form field positions.
+    """
+    __slots__ = (
+        "form", "grid", "normal_row", "special_rows", "error_row", "help_text_html", "errors_on_separate_row",
+        "top_errors", "options_cache", "hidden_fields", "finished", "rendered_count", "fields_time",
+        "error_free",
+    )
+
+    def __init__(self, form, grid, normal_row, special_rows, error_row, help_text_html,
+                 errors_on_separate_row):
+        self.form = form
+        self.grid = grid
+        grid.reset(form.get_field_positions())
+        self.normal_row = normal_row
+        self.special_rows = special_rows
+        self.error_row = error_row
+        self.help_text_html = help_text_html
+        self.errors_on_separate_row = errors_on_separate_row
+        # Unbound forms and forms without errors are rendered without error lists
+        self.error_free = not form.is_bound or not form.errors
+        self.top_errors = [] if self.error_free else form.non_field_errors().copy()
+        self.options_cache = form.style.options_cache
+        self.hidden_fields = []
+        self.finished = False
+        self.rendered_count = 0
+        self.fields_time = 0.0
+
+    def visible_names(self):
+        form = self.form
+        return [
+            name for name, field in form.fields.items()
+            if form.get_widget_kind(name, field) != HIDDEN
+        ]
+
+    def unplaced_names(self):
+        """Return names of visible fields which are not in the grid layout"""
+        grid_fields = self.form.style.grid_fields
+        return [name for name in self.visible_names() if name not in grid_fields]
+
+    def render_all(self):
+        for name in self.visible_names():
+            self.render(name)
+        self.finish()
+
+    def finish(self):
+        """Render hidden fields and top errors"""
+        if self.finished:
+            return
+        self.finished = True
+        form = self.form
+        for name, field in form.fields.items():
+            if form.get_widget_kind(name, field) == HIDDEN:
+                self.render(name)
+        if self.top_errors:
+            self.grid['top_errors'] = self.error_row % self.top_errors
+
+        if self.hidden_fields:  # Insert any hidden fields in the last row.
+            self.grid.rendered_hidden_fields = ''.join(self.hidden_fields)
+
+    def record(self, start):
+        """Pass time spent in field rendering and in the grid to the collectors"""
+        total = perf_counter() - start
+        form = self.form
+        instrumentation.record_duration(form, instrumentation.FIELDS, self.fields_time, self.rendered_count)
+        instrumentation.record_duration(form, instrumentation.GRID, total - self.fields_time, self.rendered_count)
+
+    def render(self, name):
+        if instrumentation.active:
+            start = perf_counter()
+            self._render(name)
+            self.fields_time += perf_counter() - start
+            self.rendered_count += 1
+        else:
+            self._render(name)
+
+    def get_css_classes(self, bf):
+        """Return css classes of the row of field without errors, same as BoundField.css_classes"""
+        if type(bf).css_classes is not BoundField.css_classes:
+            return bf.css_classes()
+        if bf.field.required and hasattr(self.form, "required_css_class"):
+            return self.form.required_css_class
+        return ''
+
+    def _render(self, name):
+        form = self.form
+        output = self.grid
+        field = form.fields[name]
+        html_class_attr = ''
+        bf = form[name]
+        kind = form.get_widget_kind(name, field)
+        if self.error_free:
+            bf_errors = ''
+        else:
+            bf_errors = form.error_class(bf.errors).as_text()
+        if kind == HIDDEN:
+            if bf_errors:
+                self.top_errors.extend(
+                    ['(Hidden field %(name)s) %(error)s' % {'name': name, 'error': str(e)}
+                     for e in bf_errors.splitlines(keepends=False)])
+            self.hidden_fields.append(str(bf))
+        else:
+            # Create a 'class="..."' attribute if the row should have any
+            # CSS classes applied.
+            if self.error_free:
+                css_classes = self.get_css_classes(bf)
             else:
-                # Create a 'class="..."' attribute if the row should have any
-                # CSS classes applied.
                 css_classes = bf.css_classes()
-                if css_classes:
-                    html_class_attr = ' class="%s"' % css_classes
+            if css_classes:
+                html_class_attr = ' class="%s"' % css_classes
 
-                if errors_on_separate_row and bf_errors:
-                    output.set_error(name, error_row % str(bf_errors))
+            if self.errors_on_separate_row and bf_errors:
+                output.set_error(name, self.error_row % str(bf_errors))
 
-                if bf_errors:
-                    error_class = self.style.css_classes['invalid_input']
-                else:
-                    error_class = ""
-                if bf.label:
-                    label = conditional_escape(bf.label)
-
-                    # change label attrs base on input type
-                    if isinstance(field.widget, CheckboxInput):
-                        attrs = {"class": self.style.css_classes['label_checkbox']}
-                        label_suffix = ""
-                    else:
-                        attrs = {"class": self.style.css_classes['label']}
-                        label_suffix = ":"
-                    label = bf.label_tag(label, attrs=attrs, label_suffix=label_suffix) or ''
+            if bf_errors:
+                error_class = form.css_classes['invalid_input']
+            else:
+                error_class = ""
+            if bf.label:
+                label = conditional_escape(bf.label)
 
+                # change label attrs base on input type
+                if kind == CHECKBOX:
+                    attrs = {"class": form.css_classes['label_checkbox']}
+                    label_suffix = ""
                 else:
-                    label = ''
+                    attrs = {"class": form.css_classes['label']}
+                    label_suffix = ":"
+                label = bf.label_tag(label, attrs=attrs, label_suffix=label_suffix) or ''
 
-                if field.help_text:
-                    help_text = help_text_html % field.help_text
-                else:
-                    help_text = ''
+            else:
+                label = ''
 
-                # Different row format for different inputs
-                if isinstance(field.widget, CheckboxInput) or isinstance(field.widget, RadioSelect):
-                    row = special_rows["checkbox"]
-                elif isinstance(field.widget, widgets.FileInput):
-                    row = special_rows["file"]
-                else:
-                    row = normal_row
-                output[name] = (row % {
-                    'errors': bf_errors,
-                    'error_class': error_class,
-                    'label': label,
-                    'field': bf,
-                    'help_text': help_text,
-                    'html_class_attr': html_class_attr,
-                    'css_classes': css_classes,
-                    'field_name': bf.html_name,
-                })
-
-        if top_errors:
-            output['top_errors'] = error_row % top_errors
-
-        if hidden_fields:  # Insert any hidden fields in the last row.
-            str_hidden = ''.join(hidden_fields)
-
-            output.rendered_hidden_fields = str_hidden
-        return mark_safe(output.get_html())
+            if field.help_text:
+                help_text = self.help_text_html % field.help_text
+            else:
+                help_text = ''
 
-    def as_div(self):
-        return self._html_output(
-            normal_row=self.style.get_normal_row(),
-            special_rows={
-                "checkbox": self.style.get_checkbox_row(),
-                "file": self.style.get_file_row()
-            },
-            error_row=self.style.get_error_row(),
-            row_ender='</div>',
-            help_text_html=' <small class="form-text text-muted">%s</small>',
-            errors_on_separate_row=self.style.errors_on_separate_row,
+            widget_html = bf
+            if kind == NORMAL and self.options_cache is not None and not field.show_hidden_initial:
+                widget_html = choices.render_field(form, bf, self.options_cache) or bf
+
+            # Different row format for different inputs
+            if kind == CHECKBOX or kind == RADIO:
+                row = self.special_rows["checkbox"]
+            elif kind == FILE:
+                row = self.special_rows["file"]
+            else:
+                row = self.normal_row
+            # Values in ROW_VALUES order
+            values = (
+                bf_errors, error_class, label, widget_html, help_text, html_class_attr, css_classes, bf.html_name,
+            )
+            fill = getattr(row, "fill", None)
+            if fill is not None:
+                output[name] = fill(values)
+            else:
+                output[name] = row % dict(zip(ROW_VALUES, values))
+
+
+def renders_with_grid(form_class):
+    """Return True if the form class renders as_div with the default grid rendering"""
+    return all(
+        getattr(form_class, name) is getattr(StyledForm, name)
+        for name in ("as_div", "render_div", "_html_output", "_iter_html_output")
+    )
+
+
+def render_many(forms):
+    """
+    Render styled forms in one pass, return list of html of the forms,
+    same as their as_div output. Div options and the grid are prepared once
+    for every form class and style, and the grid is reused for all its forms.
+    """
+    output = []
+    prepared = {}
+    for form in forms:
+        style = form.style
+        key = (form.__class__, style)
+        try:
+            options, grid = prepared[key]
+        except KeyError:
+            options = form.get_div_options()
+            grid = style.get_grid()
+            if (style.fragments is not None or not renders_with_grid(form.__class__)
+                    or type(grid).get_html is not Grid.get_html):
+                grid = None
+            prepared[key] = options, grid
+        if grid is None:
+            output.append(form.as_div())
+            continue
+        start = instrumentation.start()
+        grid.renderer = renderer = FieldRenderer(
+            form,
+            grid,
+            options["normal_row"],
+            options["special_rows"],
+            options["error_row"],
+            options["help_text_html"],
+            options["errors_on_separate_row"],
         )
+        output.append(mark_safe(grid.get_html()))
+        if start is not None:
+            renderer.record(start)
+    for options, grid in prepared.values():
+        if grid is not None:
+            grid.reset()
+    return output
+
+
+class CleanPool:
+    """
+    Thread pool shared by all forms cleaning fields in parallel, its size is
+    the STYLED_FORMS_CLEAN_WORKERS setting (default 16). A form class uses at
+    most Style.parallel_clean_workers of the threads at once. Cleaners are
+    never queued, when the pool or the class has no free thread the caller
+    cleans the field itself, so cleaners still running after a timeout
+    don't delay fields of other forms.
+    """
+
+    def __init__(self):
+        self.executor = None
+        self.slots = None
+        # form class -> (workers, semaphore), classes are not kept alive
+        self.class_slots = weakref.WeakKeyDictionary()
+        self.lock = threading.Lock()
+
+    def get_executor(self):
+        """Return the executor, created on first use"""
+        with self.lock:
+            if self.executor is None:
+                workers = getattr(settings, "STYLED_FORMS_CLEAN_WORKERS", 16)
+                self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="styled-forms-clean")
+                self.slots = threading.BoundedSemaphore(workers)
+            return self.executor, self.slots
+
+    def get_class_slots(self, form_class, workers):
+        """Return semaphore limiting threads used by the form class"""
+        slots = self.class_slots.get(form_class)
+        if slots is None or slots[0] != workers:
+            with self.lock:
+                slots = self.class_slots.get(form_class)
+                if slots is None or slots[0] != workers:
+                    slots = self.class_slots[form_class] = (workers, threading.BoundedSemaphore(workers))
+        return slots[1]
+
+    def submit(self, form_class, workers, fn, *args):
+        """Return future of fn run in the pool, None when no thread is free"""
+        class_slots = self.get_class_slots(form_class, workers)
+        if not class_slots.acquire(blocking=False):
+            return None
+        executor, slots = self.get_executor()
+        if not slots.acquire(blocking=False):
+            class_slots.release()
+            return None
+        future = executor.submit(run_in_worker, fn, *args)
+        future.add_done_callback(partial(release_slots, slots, class_slots))
+        return future
+
+    def shutdown(self):
+        """Stop the executor, cleaners which didn't start are cancelled"""
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def release_slots(slots, class_slots, future):
+    slots.release()
+    class_slots.release()
+
+
+def run_in_worker(fn, *args):
+    """Call fn closing database connections of the pool thread which are unusable or expired"""
+    close_old_connections()
+    try:
+        return fn(*args)
+    finally:
+        close_old_connections()
+
+
+clean_pool = CleanPool()
+atexit.register(clean_pool.shutdown)
+
+
+class_factory_lock = threading.Lock()
+
+
+def styled_class(form_class, style_name=None, style=None):
+    """
+    Return StyledForm subclass of form_class.
+    :param style_name: registered style name used instead of Style.style
+    :param style: Style class merged under the form_class Style
+    Classes are created once per (form class, style name, style class) and keep
+    name, qualname and module of form_class, so they pickle and show up in profiles.
+    Cache is stored on form_class and refers to the style class weakly, so
+    generated classes are collected together with their bases.
+    """
+    cache = form_class.__dict__.get("_styled_classes")
+    if cache is None:
+        cache = {}
+        setattr(form_class, "_styled_classes", cache)
+    key = (style_name, id(style))
+    with class_factory_lock:
+        try:
+            style_ref, new_cls = cache[key]
+            if style is None or style_ref() is style:
+                return new_cls
+        except KeyError:
+            pass
+        attrs = {
+            "__module__": form_class.__module__,
+            "__qualname__": form_class.__qualname__,
+            "__doc__": form_class.__doc__,
+        }
+        if style_name is not None:
+            attrs["style_name"] = style_name
+        if style is not None:
+            NewStyle = merge_styles(style, getattr(form_class, "Style", None))
+            NewStyle.__qualname__ = "%s.Style" % form_class.__qualname__
+            NewStyle.__module__ = form_class.__module__
+            attrs["Style"] = NewStyle
+        new_cls = type(form_class.__name__, (StyledForm, form_class), attrs)
+        cache[key] = (weakref.ref(style) if style is not None else None, new_cls)
+    return new_cls
+
+
+def restyle_form(form, style_name):
+    """
+    Return copy of the form instance with the registered style attached.
+    Form is not constructed again, only the fields are copied so the original
+    widgets are not changed. Forms which are already styled are returned unchanged.
+    """
+    if isinstance(form, StyledForm):
+        return form
+    if styles.get_style(style_name) is None:
+        if not hasattr(form, "Style"):
+            return form
+        style_name = None
+    new_cls = styled_class(form.__class__, style_name)
+    new_form = new_cls.__new__(new_cls)
+    new_form.__dict__.update(form.__dict__)
+    new_form.fields = copy.deepcopy(form.fields)
+    new_form._bound_fields_cache = {}
+    new_form.apply_style(new_cls.get_style())
+    if form._errors is not None:
+        # Form was validated before it got the style
+        for name in new_form.fields:
+            new_form.set_input_valid(name, name not in form._errors)
+    return new_form
 
 
 class BootstrapForm(StyledForm):
     """StyledForm with Bootstrap classes"""
-    def __init__(self, *args, **kwargs):
-        if hasattr(self, "Style"):
-            setattr(self.Style, "style", "bootstrap")
-        else:
-            class NewStyle:
-                style = "bootstrap"
-            setattr(self, "Style", NewStyle)
-        super().__init__(*args, **kwargs)
+    style_name = "bootstrap"
 
 
 class SemanticUIForm(StyledForm):
     """StyledForm with Semantic UI classes"""
-    def __init__(self, *args, **kwargs):
-        if hasattr(self, "Style"):
-            setattr(self.Style, "style", "semanticui")
-        else:
-            class NewStyle:
-                style = "semanticui"
-            setattr(self, "Style", NewStyle)
-        super().__init__(*args, **kwargs)
+    style_name = "semanticui"
@@ -0,0 +1,20 @@
+from django.forms.formsets import BaseFormSet
+from django.utils.html import mark_safe
+
+from .forms import render_many
+
+
+class StyledFormSet(BaseFormSet):
+    """
+    Formset of styled forms rendered in one pass with render_many.
+    Use it as formset argument of formset_factory.
+    """
+    def __str__(self):
+        return self.as_div()
+
+    def as_div(self):
+        """
+        Render management form followed by the forms. Output is stripped
+        like the output of Django form renderers.
+        """
+        return mark_safe((str(self.management_form) + ''.join(render_many(self.forms))).strip())
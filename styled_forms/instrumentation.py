@@ -0,0 +1,164 @@
+"""
+Opt-in timing of styled form phases.
+
+Collectors added with add_collector get duration and number of fields of every
+phase: style resolution in StyledForm.__init__, field cleaning in _clean_fields,
+rendering of the field rows and of the grid around them. While no collector
+is added the forms only check the active flag.
+"""
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.dispatch import Signal
+
+STYLE = "style"
+CLEAN = "clean"
+FIELDS = "fields"
+GRID = "grid"
+
+PHASES = (STYLE, CLEAN, FIELDS, GRID)
+
+# Sent for every phase when SignalCollector is added,
+# with form, phase, duration and field_count arguments.
+form_phase_finished = Signal()
+
+active = False
+collectors = ()
+_lock = threading.Lock()
+
+
+def add_collector(collector):
+    global active, collectors
+    with _lock:
+        collectors = collectors + (collector,)
+        active = True
+
+
+def remove_collector(collector):
+    global active, collectors
+    with _lock:
+        collectors = tuple(c for c in collectors if c is not collector)
+        active = bool(collectors)
+
+
+def start():
+    """Return start time of the phase, or None if instrumentation is not active"""
+    return perf_counter() if active else None
+
+
+def record(form, phase, start_time, field_count):
+    """Pass duration of the phase which began at start_time to the collectors"""
+    record_duration(form, phase, perf_counter() - start_time, field_count)
+
+
+def record_duration(form, phase, duration, field_count):
+    for collector in collectors:
+        collector.collect(form, phase, duration, field_count)
+
+
+class Collector(ABC):
+    """Base class of collectors"""
+    @abstractmethod
+    def collect(self, form, phase, duration, field_count):
+        """Take duration in seconds and number of fields of the form phase"""
+
+
+class SignalCollector(Collector):
+    """Send form_phase_finished signal with sender set to the form class"""
+    def collect(self, form, phase, duration, field_count):
+        form_phase_finished.send(
+            sender=form.__class__, form=form, phase=phase, duration=duration, field_count=field_count
+        )
+
+
+class Histogram:
+    """Count, sum, min, max and bucket counts of phase durations in seconds"""
+    buckets = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.fields = 0
+        self.counts = [0] * (len(self.buckets) + 1)
+
+    def add(self, duration, field_count):
+        self.count += 1
+        self.total += duration
+        self.fields += field_count
+        if self.min is None or duration < self.min:
+            self.min = duration
+        if self.max is None or duration > self.max:
+            self.max = duration
+        self.counts[bisect_left(self.buckets, duration)] += 1
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.mean,
+            "min": self.min,
+            "max": self.max,
+            "fields": self.fields,
+            "buckets": dict(zip(self.buckets + (float("inf"),), self.counts)),
+        }
+
+
+class HistogramCollector(Collector):
+    """Aggregate durations per form class and phase in process"""
+    def __init__(self):
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def collect(self, form, phase, duration, field_count):
+        key = ("%s.%s" % (form.__class__.__module__, form.__class__.__qualname__), phase)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.add(duration, field_count)
+
+    def snapshot(self):
+        """Return dict of (form class path, phase) to histogram dict"""
+        with self._lock:
+            return {key: histogram.as_dict() for key, histogram in self.histograms.items()}
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+
+
+# ContextCollectors started in the current context
+context_collectors = ContextVar("styled_forms_context_collectors", default=())
+
+
+class ContextCollector(Collector):
+    """
+    Keep phases of forms processed in the context which started the collector,
+    e.g. a request. The context is passed to sync_to_async threads and tasks,
+    so their forms are kept too, forms of other requests are not.
+    """
+    def __init__(self):
+        self.records = []
+        self.token = None
+
+    def start(self):
+        """Collect forms of the current context"""
+        self.token = context_collectors.set(context_collectors.get() + (self,))
+
+    def stop(self):
+        if self.token is not None:
+            context_collectors.reset(self.token)
+            self.token = None
+
+    def collect(self, form, phase, duration, field_count):
+        if self in context_collectors.get():
+            self.records.append((form.__class__.__qualname__, id(form), phase, duration, field_count))
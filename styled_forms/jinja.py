@@ -0,0 +1,168 @@
+"""
+Jinja2 integration.
+
+Add the extension to the environment, or use environment() as the Django
+Jinja2 backend "environment" option::
+
+    env = Environment(extensions=["styled_forms.jinja.StyledFormsExtension"])
+
+Templates get two filters::
+
+    {{ form|styled }}
+    {{ form|custom_style("bootstrap")|styled }}
+
+Rows and grid layout of every resolved style are compiled into Jinja2 templates
+once, so the environment bytecode cache is used for them. Output is the same as as_div.
+"""
+from weakref import WeakKeyDictionary
+
+from jinja2 import BaseLoader, Environment, TemplateNotFound
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from .forms.forms import FieldRenderer, restyle_form
+from .styles import ROW_VALUES, Grid, Slot
+
+
+def raw(text):
+    """Return Jinja2 source printing text unchanged"""
+    if not text:
+        return ""
+    return "{% raw %}" + text + "{% endraw %}"
+
+
+def row_source(row):
+    """Return Jinja2 source of compiled RowTemplate"""
+    names = dict(row.slots)
+    source = []
+    for i, part in enumerate(row.parts):
+        if i in names:
+            source.append("{{ %s }}" % (names[i] or "value"))
+        else:
+            source.append(raw(part))
+    return "".join(source)
+
+
+def grid_source(plan):
+    """Return Jinja2 source of grid plan, fields are pulled from the grid object"""
+    if plan is None:
+        return "{% for chunk in grid.iter_fields() %}{{ chunk }}{% endfor %}"
+    source = []
+    for part in plan:
+        if isinstance(part, str):
+            source.append(raw(part))
+        elif part.kind == Slot.FIELD:
+            source.append("{{ grid.get_field(%r) }}" % part.name)
+        elif part.kind == Slot.ERRORS:
+            source.append("{{ grid.rendered_errors.get(%r, '') }}" % part.name)
+        elif part.kind == Slot.HIDDEN:
+            source.append("{{ grid.get_hidden_fields() }}")
+        elif part.kind == Slot.UNPLACED:
+            source.append("{{ grid.get_unplaced_fields() }}")
+    return "".join(source)
+
+
+class StyleLoader(BaseLoader):
+    """Loader of the sources compiled from styles"""
+    def __init__(self):
+        self.sources = {}
+
+    def get_source(self, environment, template):
+        try:
+            return self.sources[template], None, lambda: True
+        except KeyError:
+            raise TemplateNotFound(template)
+
+
+class JinjaRow:
+    """Row template rendered by Jinja2, used in place of RowTemplate"""
+    def __init__(self, template):
+        self.template = template
+
+    def __mod__(self, values):
+        if isinstance(values, dict):
+            return self.template.render(values)
+        return self.template.render(value=values)
+
+    def fill(self, values):
+        """Render the row with the tuple of values in ROW_VALUES order"""
+        return self.template.render(dict(zip(ROW_VALUES, values)))
+
+
+class CompiledStyle:
+    def __init__(self, rows, form):
+        self.rows = rows
+        self.form = form
+
+
+class StyleTemplates:
+    """Compiles resolved styles into Jinja2 templates once per style"""
+    def __init__(self, environment):
+        self.parent = environment
+        self.environment = None
+        self.loader = StyleLoader()
+        self.compiled = WeakKeyDictionary()
+
+    def get_template(self, name, source):
+        if self.environment is None:
+            # Own settings, so markup is the same as as_div whatever the environment options are.
+            # Overlay shares the bytecode cache of the environment.
+            self.environment = self.parent.overlay(
+                loader=self.loader,
+                autoescape=False,
+                trim_blocks=False,
+                lstrip_blocks=False,
+                keep_trailing_newline=True,
+            )
+        self.loader.sources[name] = source
+        return self.environment.get_template(name)
+
+    def compile(self, style):
+        try:
+            return self.compiled[style]
+        except KeyError:
+            pass
+        prefix = "styled_forms/%s/" % style.fingerprint
+        rows = {
+            name: JinjaRow(self.get_template(prefix + name, row_source(row)))
+            for name, row in style.rows.items()
+        }
+        form = self.get_template(prefix + "form", grid_source(style.grid_plan))
+        compiled = self.compiled[style] = CompiledStyle(rows, form)
+        return compiled
+
+    def render(self, form):
+        """Render styled form with compiled templates"""
+        style = form.style
+        grid = style.get_grid()
+        if type(grid).get_html is not Grid.get_html:
+            return form.as_div()
+        compiled = self.compile(style)
+        options = form.get_div_options()
+        grid.renderer = FieldRenderer(
+            form,
+            grid,
+            compiled.rows["normal"],
+            compiled.rows,
+            compiled.rows["error"],
+            options["help_text_html"],
+            options["errors_on_separate_row"],
+        )
+        return Markup(compiled.form.render(grid=grid))
+
+
+class StyledFormsExtension(Extension):
+    """Adds styled and custom_style filters"""
+    def __init__(self, environment):
+        super().__init__(environment)
+        templates = StyleTemplates(environment)
+        environment.extend(styled_forms_templates=templates)
+        environment.filters["styled"] = templates.render
+        environment.filters["custom_style"] = restyle_form
+
+
+def environment(**options):
+    """Return Jinja2 environment with StyledFormsExtension, for Django Jinja2 backend"""
+    extensions = list(options.pop("extensions", []))
+    extensions.append(StyledFormsExtension)
+    return Environment(extensions=extensions, **options)
@@ -0,0 +1,54 @@
+"""
+Django Debug Toolbar panel showing styled form phases of the request.
+Add "styled_forms.panels.StyledFormsPanel" to DEBUG_TOOLBAR_PANELS.
+"""
+from debug_toolbar.panels import Panel
+
+from . import instrumentation
+
+
+class StyledFormsPanel(Panel):
+    title = "Styled forms"
+    template = "styled_forms/panel.html"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.collector = None
+
+    @property
+    def nav_subtitle(self):
+        stats = self.get_stats()
+        if not stats:
+            return ""
+        return "%d forms in %.1f ms" % (len(stats["forms"]), stats["total"] * 1000)
+
+    def enable_instrumentation(self):
+        self.collector = instrumentation.ContextCollector()
+        self.collector.start()
+        instrumentation.add_collector(self.collector)
+
+    def disable_instrumentation(self):
+        if self.collector is not None:
+            instrumentation.remove_collector(self.collector)
+            try:
+                self.collector.stop()
+            except ValueError:
+                # Toolbar finished the request in another context
+                pass
+
+    def generate_stats(self, request, response):
+        forms = {}
+        total = 0.0
+        for name, form_id, phase, duration, field_count in self.collector.records:
+            form = forms.setdefault(form_id, {"name": name, "fields": 0, "total": 0.0, "phases": {}})
+            form["phases"][phase] = form["phases"].get(phase, 0.0) + duration * 1000
+            form["fields"] = max(form["fields"], field_count)
+            form["total"] += duration
+            total += duration
+        for form in forms.values():
+            form["durations"] = [form["phases"].get(phase) for phase in instrumentation.PHASES]
+        self.record_stats({
+            "forms": list(forms.values()),
+            "phases": list(instrumentation.PHASES),
+            "total": total,
+        })
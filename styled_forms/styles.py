@@ -1,4 +1,13 @@
-from types import MethodType
+import inspect
+import re
+import threading
+from functools import lru_cache
+from collections import namedtuple
+from collections.abc import Mapping
+from types import MappingProxyType
+from weakref import WeakKeyDictionary
+
+from .cache import FragmentCache, make_key
 
 num_to_words = {
     1: "one",
@@ -20,16 +29,126 @@ num_to_words = {
 }
 
 
+class Slot:
+    """
+    Place in a compiled grid plan filled with rendered field, field errors
+    or hidden fields.
+    """
+    FIELD = "field"
+    ERRORS = "errors"
+    HIDDEN = "hidden"
+    # visible fields left out of the grid layout
+    UNPLACED = "unplaced"
+    # end of grid row, streamed output is flushed there
+    BREAK = "break"
+
+    __slots__ = ("kind", "name")
+
+    def __init__(self, kind, name=None):
+        self.kind = kind
+        self.name = name
+
+    def __repr__(self):
+        return "<Slot %s %s>" % (self.kind, self.name)
+
+
+# Named values of a field row, in the order FieldRenderer passes them to RowTemplate.fill
+ROW_VALUES = (
+    "errors", "error_class", "label", "field", "help_text", "html_class_attr", "css_classes", "field_name",
+)
+
+no_positions = MappingProxyType({})
+
+
+class FieldValues(Mapping):
+    """
+    Values of form fields kept in a list addressed by the field position
+    in the form layout. Positions are shared by all forms of the layout,
+    names which are not in it get positions of their own on first write.
+    Missing values are None.
+    """
+    __slots__ = ("positions", "values", "_own")
+
+    def __init__(self, positions=no_positions):
+        self.positions = positions
+        self.values = [None] * len(positions)
+        self._own = False
+
+    def __getitem__(self, name):
+        value = self.values[self.positions[name]]
+        if value is None:
+            raise KeyError(name)
+        return value
+
+    def get(self, name, default=None):
+        index = self.positions.get(name)
+        if index is None or self.values[index] is None:
+            return default
+        return self.values[index]
+
+    def __setitem__(self, name, value):
+        try:
+            index = self.positions[name]
+        except KeyError:
+            if not self._own:
+                self.positions = dict(self.positions)
+                self._own = True
+            index = self.positions[name] = len(self.values)
+            self.values.append(None)
+        self.values[index] = value
+
+    def __iter__(self):
+        values = self.values
+        return (name for name, index in self.positions.items() if values[index] is not None)
+
+    def __len__(self):
+        return len(self.values) - self.values.count(None)
+
+    def __repr__(self):
+        return "<FieldValues %r>" % dict(self.items())
+
+
+def join_fragments(plan):
+    """Merge neighbouring static fragments of the plan"""
+    output = []
+    for part in plan:
+        if output and isinstance(part, str) and isinstance(output[-1], str):
+            output[-1] += part
+        else:
+            output.append(part)
+    return output
+
+
 class Grid:
     """
     Base Grid class used for rendering fields in appropriate position.
+    Rendered fields and errors are FieldValues addressed by the field position.
     """
+    default_column_class = ""
+    row_start = ""
+    row_end = ""
+
+    __slots__ = (
+        "grid", "plan", "renderer", "rendered_fields", "rendered_hidden_fields", "rendered_errors",
+        "errors_on_separate_row", "append_unplaced",
+    )
+
     def __init__(self, grid=None, errors_on_separate_row=False):
         self.grid = grid
-        self.rendered_fields = {}
-        self.rendered_hidden_fields = ""
-        self.rendered_errors = {}
+        self.plan = None
         self.errors_on_separate_row = errors_on_separate_row
+        self.append_unplaced = False
+        self.reset()
+
+    def reset(self, positions=no_positions):
+        """
+        Drop state of the last render, so the grid can render another form.
+        Positions map field names of the next form to their index.
+        """
+        self.renderer = None
+        self.rendered_fields = FieldValues(positions)
+        self.rendered_hidden_fields = ""
+        self.rendered_errors = FieldValues(positions)
 
     def __setitem__(self, key, value):
         self.rendered_fields[key] = value
@@ -37,96 +156,427 @@ class Grid:
     def items(self):
         return self.rendered_fields.items()
 
+    @classmethod
+    def compile(cls, grid, errors_on_separate_row=False):
+        """
+        Return grid plan, flat list of static html fragments and slots,
+        or None if fields are rendered one after another.
+        Raise ValueError or TypeError for wrong field width.
+        """
+        return None
+
+    @classmethod
+    def compile_rows(cls, grid, errors_on_separate_row=False):
+        """Build grid plan using row_start, row_end and column classes"""
+        plan = []
+        a = plan.append
+        for row in grid:
+            a(cls.row_start)
+            for field in row:
+                name, column_class = cls.get_column(field)
+                a(f"<div class='{column_class}'>\n")
+                a(Slot(Slot.FIELD, name))
+                if errors_on_separate_row:
+                    a(Slot(Slot.ERRORS, name))
+                a("</div>\n")
+            a(cls.row_end)
+            a(Slot(Slot.BREAK))
+        a(Slot(Slot.UNPLACED))
+        a("<div class='form-row'>\n")
+        a(Slot(Slot.HIDDEN))
+        a("</div>\n")
+        return join_fragments(plan)
+
+    @classmethod
+    def compile_column(cls, field, errors_on_separate_row=False):
+        """
+        Return plan of a single grid column, the field wrapped the same way
+        as in the compiled grid, without the row. None if the grid has no layout.
+        """
+        plan = cls.compile([[field]], errors_on_separate_row)
+        if plan is None:
+            return None
+        end = next(
+            (i for i, part in enumerate(plan) if isinstance(part, Slot) and part.kind == Slot.BREAK), len(plan)
+        )
+        plan = list(plan[:end])
+        if cls.row_start and isinstance(plan[0], str) and plan[0].startswith(cls.row_start):
+            plan[0] = plan[0][len(cls.row_start):]
+        if cls.row_end and isinstance(plan[-1], str) and plan[-1].endswith(cls.row_end):
+            plan[-1] = plan[-1][:-len(cls.row_end)]
+        return tuple(part for part in plan if part != "")
+
+    @classmethod
+    def get_column(cls, field):
+        """Return field name and css class of grid column"""
+        if isinstance(field, tuple) or isinstance(field, list):
+            return field[0], cls.get_width_class(field[1])
+        return field, cls.default_column_class
+
+    @classmethod
+    def get_width_class(cls, width):
+        """Return css class for column width, grids without width classes take css classes"""
+        if isinstance(width, str):
+            return width
+        raise TypeError("Wrong width type")
+
+    def get_plan(self):
+        if self.plan is None and self.grid:
+            self.plan = self.compile(self.grid, self.errors_on_separate_row)
+        return self.plan
+
+    def get_field(self, name):
+        """Return rendered field, rendering it when the grid has a renderer"""
+        try:
+            return self.rendered_fields[name]
+        except KeyError:
+            if self.renderer is None:
+                raise
+        self.renderer.render(name)
+        return self.rendered_fields[name]
+
+    def get_hidden_fields(self):
+        """Return rendered hidden fields"""
+        if self.renderer is not None:
+            self.renderer.finish()
+        return self.rendered_hidden_fields
+
+    def get_unplaced_fields(self):
+        """
+        Return html of visible fields which are not in the grid layout,
+        each in its own row, when the style appends unplaced fields.
+        """
+        if not self.append_unplaced or self.renderer is None:
+            return ""
+        names = self.renderer.unplaced_names()
+        if not names:
+            return ""
+        plan = self.compile([[name] for name in names], self.errors_on_separate_row)
+        # Rows only, the hidden fields row is rendered by the form plan
+        breaks = [i for i, part in enumerate(plan) if isinstance(part, Slot) and part.kind == Slot.BREAK]
+        if breaks:
+            plan = plan[:breaks[-1]]
+        plan = [
+            part for part in plan
+            if isinstance(part, str) or part.kind not in (Slot.HIDDEN, Slot.UNPLACED)
+        ]
+        return ''.join(self.iter_plan(plan))
+
+    def iter_items(self):
+        """Yield names and html of visible fields followed by top errors"""
+        if self.renderer is None:
+            yield from self.rendered_fields.items()
+            return
+        for name in self.renderer.visible_names():
+            yield name, self.get_field(name)
+        self.renderer.finish()
+        if "top_errors" in self.rendered_fields:
+            yield "top_errors", self.rendered_fields["top_errors"]
+
+    def iter_html(self):
+        """Yield form html in chunks, one chunk per grid row"""
+        plan = self.get_plan()
+        if plan is None:
+            yield from self.iter_fields()
+        else:
+            yield from self.iter_plan(plan)
+
+    def iter_plan(self, plan):
+        """Yield html of the plan in chunks split at row breaks"""
+        output = []
+        a = output.append
+        for part in plan:
+            if part.__class__ is str:
+                a(part)
+            elif part.kind == Slot.FIELD:
+                a(self.get_field(part.name))
+            elif part.kind == Slot.ERRORS:
+                a(self.rendered_errors.get(part.name, ""))
+            elif part.kind == Slot.HIDDEN:
+                a(self.get_hidden_fields())
+            elif part.kind == Slot.UNPLACED:
+                a(self.get_unplaced_fields())
+            else:
+                yield ''.join(output)
+                output.clear()
+        if output:
+            yield ''.join(output)
+
+    def iter_field(self, name):
+        """Yield html of a single field rendered without grid layout"""
+        yield self.get_field(name)
+
+    def iter_fields(self):
+        """Yield html of fields rendered one after another"""
+        separator = ""
+        for name, value in self.iter_items():
+            yield separator + value
+            separator = "\n"
+
     def get_html(self):
         """Return form html"""
-        return '\n'.join(self.rendered_fields.values())
+        return ''.join(self.iter_html())
 
     def set_error(self, name, value):
         self.rendered_errors[name] = value
 
 
 class BootstrapGrid(Grid):
-    """Override get_html method to use Bootstrap grid"""
-    def get_html(self):
-        if self.grid:
-            output = []
-            a = output.append
-            for row in self.grid:
-                a("<div class='form-row'>\n")
-                for field in row:
-                    if isinstance(field, tuple) or isinstance(field, list):
-                        f = field[0]
-                        width = field[1]
-                        if isinstance(width, int):
-                            if not 1 <= width <= 12:
-                                raise ValueError("Bootstrap field width must be between 1 and 12")
-                            width_class = f"col-{width}"
-                        elif isinstance(width, str):
-                            width_class = width
-                        else:
-                            raise TypeError("Wrong width type")
-                    else:
-                        f = field
-                        width_class = "col"
-                    a(f"<div class='{width_class}'>\n")
-                    a(self.rendered_fields[f])
-                    a("</div>\n")
-                a("</div>\n")
-            a("<div class='form-row'>\n")
-            a(self.rendered_hidden_fields)
-            a("</div>\n")
-            return ''.join(output)
-        else:
-            return '\n'.join(self.rendered_fields.values())
+    """Compile grid layout to Bootstrap grid"""
+    default_column_class = "col"
+    row_start = "<div class='form-row'>\n"
+    row_end = "</div>\n"
+
+    @classmethod
+    def compile(cls, grid, errors_on_separate_row=False):
+        if not grid:
+            return None
+        return cls.compile_rows(grid)
+
+    @classmethod
+    def get_width_class(cls, width):
+        if isinstance(width, int):
+            if not 1 <= width <= 12:
+                raise ValueError("Bootstrap field width must be between 1 and 12")
+            return f"col-{width}"
+        elif isinstance(width, str):
+            return width
+        raise TypeError("Wrong width type")
 
 
 class SemanticUIGrid(Grid):
     """
-    Override get_html method to use Semantic UI grid.
+    Compile grid layout to Semantic UI grid.
     """
-    def get_html(self):
-        if self.grid:
-            output = []
-            a = output.append
-            for row in self.grid:
-                a("<div class='field'>\n")
-                a("<div class='fields'>\n")
-                for field in row:
-                    if isinstance(field, tuple) or isinstance(field, list):
-                        f = field[0]
-                        width = field[1]
-                        if isinstance(width, int):
-                            if not 1 <= width <= 16:
-                                raise ValueError("Semantic-UI field width must be between 1 and 16")
-                            width_class = f"{num_to_words[width]} wide field"
-                        elif isinstance(width, str):
-                            width_class = f"{width} wide field"
-                        else:
-                            raise TypeError("Wrong width type")
-                    else:
-                        f = field
-                        width_class = "field"
-                    a(f"<div class='{width_class}'>\n")
-                    a(self.rendered_fields[f])
-                    if self.errors_on_separate_row:
-                        if f in self.rendered_errors:
-                            a(self.rendered_errors[f])
-                    a("</div>\n")
+    default_column_class = "field"
+    row_start = "<div class='field'>\n<div class='fields'>\n"
+    row_end = "</div>\n</div>\n"
 
-                a("</div>\n")
-                a("</div>\n")
-            a("<div class='form-row'>\n")
-            a(self.rendered_hidden_fields)
-            a("</div>\n")
-            return ''.join(output)
-        else:
-            output = []
-            a = output.append
-            for name, value in self.rendered_fields.items():
-                a(value)
-                if name in self.rendered_errors:
-                    a(self.rendered_errors[name])
-            return '\n'.join(output)
+    @classmethod
+    def compile(cls, grid, errors_on_separate_row=False):
+        if not grid:
+            return None
+        return cls.compile_rows(grid, errors_on_separate_row)
+
+    @classmethod
+    def get_width_class(cls, width):
+        if isinstance(width, int):
+            if not 1 <= width <= 16:
+                raise ValueError("Semantic-UI field width must be between 1 and 16")
+            return f"{num_to_words[width]} wide field"
+        elif isinstance(width, str):
+            return f"{width} wide field"
+        raise TypeError("Wrong width type")
+
+    def iter_field(self, name):
+        yield self.get_field(name)
+        if name in self.rendered_errors:
+            yield "\n" + self.rendered_errors[name]
+
+    def iter_fields(self):
+        separator = ""
+        for name, value in self.iter_items():
+            yield separator + value
+            separator = "\n"
+            if name in self.rendered_errors:
+                yield separator + self.rendered_errors[name]
+
+
+slot_re = re.compile(r"%(?:\((\w+)\))?s|%%")
+indent_re = re.compile(r"\n[ \t]+")
+
+
+class RowTemplate:
+    """
+    Row html template compiled once into literal chunks and slots.
+    Supports the same %(name)s / %s placeholders as string formatting,
+    so row % values keeps working, but rendering is a plain join.
+    """
+    __slots__ = ("parts", "slots", "positions")
+
+    def __init__(self, template, collapse_whitespace=False):
+        if collapse_whitespace:
+            template = indent_re.sub("\n", template)
+        parts = []
+        slots = []
+        literal = []
+        pos = 0
+        for match in slot_re.finditer(template):
+            literal.append(template[pos:match.start()])
+            pos = match.end()
+            if match.group(0) == "%%":
+                literal.append("%")
+                continue
+            parts.append("".join(literal))
+            literal = []
+            slots.append((len(parts), match.group(1)))
+            parts.append(None)
+        literal.append(template[pos:])
+        parts.append("".join(literal))
+        self.parts = parts
+        self.slots = tuple(slots)
+        self.positions = self.get_positions()
+
+    @classmethod
+    def from_parts(cls, parts, slots):
+        """Return template built from already compiled parts and slots"""
+        template = cls.__new__(cls)
+        template.parts = list(parts)
+        template.slots = tuple((index, name) for index, name in slots)
+        template.positions = template.get_positions()
+        return template
+
+    def get_positions(self):
+        """
+        Return slots as (part index, position in ROW_VALUES) pairs,
+        or None if the template has other slots.
+        """
+        if not all(name in ROW_VALUES for _, name in self.slots):
+            return None
+        return tuple((index, ROW_VALUES.index(name)) for index, name in self.slots)
+
+    def render(self, values):
+        """
+        Fill slots with values. Named slots take values from the mapping,
+        positional slot takes values itself.
+        """
+        parts = self.parts[:]
+        for index, name in self.slots:
+            parts[index] = str(values if name is None else values[name])
+        return "".join(parts)
+
+    __mod__ = render
+
+    def fill(self, values):
+        """Fill slots with the tuple of values in ROW_VALUES order"""
+        if self.positions is None:
+            return self.render(dict(zip(ROW_VALUES, values)))
+        parts = self.parts[:]
+        for index, position in self.positions:
+            parts[index] = str(values[position])
+        return "".join(parts)
+
+    def __str__(self):
+        """Return template source"""
+        names = dict(self.slots)
+        return "".join(
+            part.replace("%", "%%") if i not in names
+            else "%%(%s)s" % names[i] if names[i] else "%s"
+            for i, part in enumerate(self.parts)
+        )
+
+
+def compile_row(template, collapse_whitespace=False):
+    """Return compiled RowTemplate, already compiled templates are returned unchanged"""
+    if isinstance(template, RowTemplate):
+        return template
+    return RowTemplate(template, collapse_whitespace)
+
+
+def is_method(value):
+    """Return True if the style class attribute is a method"""
+    return callable(value) or isinstance(value, (staticmethod, classmethod))
+
+
+def join_classes(*classes):
+    """Join css classes skipping empty ones"""
+    return " ".join(c for c in classes if c)
+
+
+class InputClasses:
+    """
+    Ordered set of css classes of a single input. Validation state is kept
+    as a flag and its class is added only when the classes are joined,
+    so repeated validation doesn't change the result.
+    Instances are immutable and shared by all inputs with the same classes,
+    get them with get_input_classes.
+    """
+    __slots__ = ("classes", "valid")
+
+    def __init__(self, classes, valid=None):
+        self.classes = classes
+        self.valid = valid
+
+    def set_valid(self, valid):
+        """Return classes with the validation state"""
+        return get_input_classes(self.classes, valid)
+
+    def join(self, valid_class="", invalid_class=""):
+        """Return value of the class attribute"""
+        return join_input_classes(self.classes, self.valid, valid_class, invalid_class)
+
+
+@lru_cache(maxsize=1024)
+def compile_appended_column(grid_class, name, errors_on_separate_row):
+    """Return plan of the grid column of a field appended after the grid"""
+    return grid_class.compile_column(name, errors_on_separate_row)
+
+
+@lru_cache(maxsize=1024)
+def split_classes(*groups):
+    """Return tuple of unique css classes of the groups"""
+    return tuple(dict.fromkeys(c for group in groups if group for c in group.split()))
+
+
+@lru_cache(maxsize=1024)
+def drop_classes(classes, dropped):
+    """Return classes without the dropped ones"""
+    return tuple(c for c in classes if c not in dropped)
+
+
+@lru_cache(maxsize=4096)
+def get_input_classes(classes, valid=None):
+    return InputClasses(classes, valid)
+
+
+@lru_cache(maxsize=4096)
+def join_input_classes(classes, valid, valid_class, invalid_class):
+    if valid is not None:
+        state_class = valid_class if valid else invalid_class
+        if state_class:
+            classes += tuple(c for c in state_class.split() if c not in classes)
+    return " ".join(classes)
+
+
+class CssClasses(Mapping):
+    """
+    Per form layer on top of the frozen style css classes.
+    Reads fall through to the base mapping, writes are stored on the instance,
+    so the shared style is never modified.
+    """
+    __slots__ = ("base", "_own")
+
+    def __init__(self, base):
+        self.base = base
+        self._own = None
+
+    def __getitem__(self, key):
+        if self._own is not None and key in self._own:
+            return self._own[key]
+        return self.base[key]
+
+    def __setitem__(self, key, value):
+        if self._own is None:
+            self._own = {}
+        self._own[key] = value
+
+    def __iter__(self):
+        yield from self.base
+        if self._own is not None:
+            for key in self._own:
+                if key not in self.base:
+                    yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def reset(self, key=None):
+        """Remove instance value of the key or all instance values"""
+        if self._own is not None:
+            if key is None:
+                self._own = None
+            else:
+                self._own.pop(key, None)
 
 
 class Style:
@@ -157,44 +607,137 @@ class Style:
     fields_per_row = 1
     grid_class = Grid
     errors_on_separate_row = False
+    collapse_whitespace = False
+    # raise at first instantiation when a grid field is not in base_fields,
+    # set to False for grid fields added in the form __init__
+    check_grid_fields = True
+    # what to do with visible fields left out of the grid: "ignore", "report" or "append"
+    unplaced_fields = "ignore"
+    fragment_cache = False
+    fragment_cache_size = 128
+    fragment_cache_ttl = None
+    fragment_cache_backend = None
+    choice_cache = False
+    choice_cache_size = 256
+    choice_cache_ttl = None
+    # async clean_<field> methods awaited at once by ais_valid
+    clean_concurrency = 10
+    # True or list of field names cleaned on the shared thread pool
+    parallel_clean = False
+    # threads of the shared pool used by one form class at once
+    parallel_clean_workers = 4
+    parallel_clean_timeout = None
+
+    def __new__(cls, style=None, css_classes=None):
+        # Methods defined in the style class become methods of a generated
+        # Style subclass, so they are looked up through the class like any other.
+        methods = {}
+        if style is not None:
+            for prop, value in style.__dict__.items():
+                if not prop.startswith("__") and prop not in ['grid', 'grid_class', 'css_classes']:
+                    if is_method(value):
+                        methods[prop] = value
+        if methods:
+            cls = type(cls.__name__, (cls,), methods)
+        return super().__new__(cls)
 
     def __init__(self, style=None, css_classes=None):
+        classes = dict(self.css_classes)
 
         if hasattr(style, "css_classes"):
             css_classes = style.css_classes
 
         if css_classes is not None:
-            for key, value in self.css_classes.items():
-                v = css_classes.get(key, None)
-                if v is not None:
-                    self.css_classes[key] = v
+            for key, value in css_classes.items():
+                if value is not None:
+                    classes[key] = value
+        self.css_classes = MappingProxyType(classes)
 
         if style is not None:
             for prop, value in style.__dict__.items():
                 if not prop.startswith("__"):
-                    if prop not in ['grid', 'css_classes']:
-                        if callable(value):
-                            setattr(self, prop, MethodType(value, self))
-                        else:
-                            if hasattr(self, prop):
-                                setattr(self, prop, value)
-
-        if style:
-            if hasattr(style, 'grid'):
-                if hasattr(style, "grid_class"):
-                    self.grid = style.grid_class(style.grid, self.errors_on_separate_row)
-                else:
-                    self.grid = self.grid_class(style.grid, self.errors_on_separate_row)
-            else:
-                if hasattr(style, "grid_class"):
-                    self.grid = style.grid_class(None, self.errors_on_separate_row)
-                else:
-                    self.grid = self.grid_class(None, self.errors_on_separate_row)
+                    if prop not in ['grid', 'grid_class', 'css_classes'] and not is_method(value):
+                        if hasattr(self, prop):
+                            setattr(self, prop, value)
+            self.grid = getattr(style, "grid", None)
+            self.grid_class = getattr(style, "grid_class", self.grid_class)
         else:
-            self.grid = self.grid_class(None, self.errors_on_separate_row)
+            self.grid = None
+        self.rows = self.compile_rows()
+        grid_plan = self.grid_class.compile(self.grid, self.errors_on_separate_row)
+        self.grid_plan = tuple(grid_plan) if grid_plan is not None else None
+        if self.unplaced_fields not in ("ignore", "report", "append"):
+            raise ValueError("unplaced_fields must be 'ignore', 'report' or 'append'")
+        self.grid_fields = frozenset(self.get_grid_fields())
+        self.field_plans = MappingProxyType(self.compile_field_plans())
+        self.fingerprint = make_key(
+            sorted(self.css_classes.items()),
+            [str(row) for row in self.rows.values()],
+            self.grid_plan,
+            self.unplaced_fields,
+        )
+        if self.fragment_cache:
+            self.fragments = FragmentCache(
+                self.fragment_cache_size, self.fragment_cache_ttl, self.fragment_cache_backend
+            )
+        else:
+            self.fragments = None
+        if self.choice_cache:
+            self.options_cache = FragmentCache(self.choice_cache_size, self.choice_cache_ttl)
+        else:
+            self.options_cache = None
+        self._frozen = True
+
+    def __setattr__(self, name, value):
+        if getattr(self, "_frozen", False):
+            raise AttributeError("Resolved styles are immutable, can't set '%s'" % name)
+        super().__setattr__(name, value)
+
+    def get_grid(self):
+        """Return new grid instance which holds the state of a single render"""
+        grid = self.grid_class(self.grid, self.errors_on_separate_row)
+        grid.plan = self.grid_plan
+        grid.append_unplaced = self.unplaced_fields == "append"
+        return grid
+
+    def compile_field_plans(self):
+        """Return dict of grid field names to plans of their grid columns"""
+        plans = {}
+        if self.grid_plan is not None:
+            for row in self.grid:
+                for field in row:
+                    name = self.grid_class.get_column(field)[0]
+                    if name not in plans:
+                        plans[name] = self.grid_class.compile_column(field, self.errors_on_separate_row)
+        return plans
 
-    def render(self):
-        self.grid.get_html()
+    def get_field_plan(self, name):
+        """
+        Return plan of the grid column of the field, or None if the field is
+        rendered without grid layout.
+        """
+        plan = self.field_plans.get(name)
+        if plan is None and self.grid_plan is not None and self.unplaced_fields == "append":
+            plan = compile_appended_column(self.grid_class, name, self.errors_on_separate_row)
+        return plan
+
+    def get_grid_fields(self):
+        """Return names of the fields placed in the grid"""
+        if self.grid_plan is None:
+            return ()
+        return tuple(
+            part.name for part in self.grid_plan
+            if isinstance(part, Slot) and part.kind == Slot.FIELD
+        )
+
+    def compile_rows(self):
+        """Compile row templates returned by get_*_row methods"""
+        return MappingProxyType({
+            "normal": compile_row(self.get_normal_row(), self.collapse_whitespace),
+            "checkbox": compile_row(self.get_checkbox_row(), self.collapse_whitespace),
+            "file": compile_row(self.get_file_row(), self.collapse_whitespace),
+            "error": compile_row(self.get_error_row(), self.collapse_whitespace),
+        })
 
     def get_default_row(self):
         return f"""
@@ -340,19 +883,87 @@ class SemanticUIUIStyle(SemanticUI, Style):
     pass
 
 
+def merge_styles(*layers):
+    """
+    Merge style classes into a single style class. Later layers win,
+    attributes inherited by a layer are merged along its MRO and
+    css_classes dicts are merged key by key.
+    """
+    props = {}
+    css_classes = {}
+    for layer in layers:
+        if layer is None:
+            continue
+        for klass in reversed(inspect.getmro(layer)):
+            if klass is object:
+                continue
+            props.update((key, value) for key, value in klass.__dict__.items() if not key.startswith("__"))
+            css_classes.update(klass.__dict__.get("css_classes", {}))
+    props["css_classes"] = css_classes
+    return type("NewStyle", (), props)
+
+
+StylesSnapshot = namedtuple("StylesSnapshot", ["styles", "version"])
+StylesSnapshot.__doc__ = "Immutable mapping of registered styles, replaced as a whole on register"
+
+
 class StylesData:
-    """Holds registered styles"""
+    """
+    Holds registered styles and caches styles resolved for form classes.
+    Readers take the current snapshot without locking, register swaps in
+    a new snapshot. Resolved styles are frozen, so they are shared between
+    threads and tasks as they are.
+    """
     def __init__(self):
-        self._styles = {}
+        self._snapshot = StylesSnapshot(MappingProxyType({}), 0)
+        self._resolved = WeakKeyDictionary()
+        self._lock = threading.RLock()
+
+    def snapshot(self):
+        """Return current StylesSnapshot"""
+        return self._snapshot
 
     def get_style(self, name):
-        try:
-            return self._styles[name]
-        except KeyError:
-            return None
+        return self._snapshot.styles.get(name)
 
     def register(self, name, style):
-        self._styles[name] = style
+        with self._lock:
+            registered = dict(self._snapshot.styles)
+            registered[name] = style
+            # Styles resolved from the replaced one are dropped by resolve
+            self._snapshot = StylesSnapshot(MappingProxyType(registered), self._snapshot.version + 1)
+
+    def resolve(self, form_class, name=None):
+        """
+        Return Style instance for the form class merged with the registered
+        style called name. Result is computed once and shared by all form instances.
+        """
+        try:
+            registered, style = self._resolved[form_class][name]
+            if registered is self._snapshot.styles.get(name):
+                return style
+        except KeyError:
+            pass
+        with self._lock:
+            snapshot = self._snapshot
+            resolved = self._resolved.get(form_class, {})
+            registered = snapshot.styles.get(name)
+            if name in resolved and resolved[name][0] is registered:
+                return resolved[name][1]
+            user_style = getattr(form_class, "Style", None)
+            if name is not None:
+                if registered is None:
+                    raise Exception("Style '%s' not found" % name)
+                style = Style(style=merge_styles(registered, user_style))
+            elif user_style is not None:
+                style = Style(style=merge_styles(user_style))
+            else:
+                style = Style()
+            # Per class dicts are replaced, never changed, so readers don't need the lock
+            resolved = dict(resolved)
+            resolved[name] = (registered, style)
+            self._resolved[form_class] = resolved
+        return style
 
 
 styles = StylesData()
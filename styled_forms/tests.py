@@ -1,3 +1,828 @@
-from django.test import TestCase
+import asyncio
+import unittest
+from unittest import mock
+import datetime
+import gc
+import json
+import os
+import tempfile
+import threading
+import warnings
+import weakref
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django import forms
+from django.db import models
+from django.forms import formset_factory
+from django.template import Context, Template
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import translation
+
+try:
+    import jinja2
+except ImportError:  # Jinja2 is optional
+    jinja2 = None
+
+from . import choices, instrumentation, styles, themes
+from .decorators import bootstrap_style_form
+from .forms import BootstrapForm, SemanticUIForm, StyledFormSet, examples, render_many
+from .forms.forms import FieldRenderer, StyledForm, UnplacedFieldsWarning
+from .styles import Grid, StylesData
+from .utils import create_style
+from .views import FieldRowView
+
+
+class Item(models.Model):
+    name = models.CharField(max_length=20)
+    code = models.CharField(max_length=20, unique=True)
+
+    class Meta:
+        app_label = "styled_forms"
+
+
+class GridFieldsTests(SimpleTestCase):
+    def test_model_form_grid(self):
+        class ItemForm(BootstrapForm, forms.ModelForm):
+            class Meta:
+                model = Item
+                fields = ["name"]
+
+            class Style:
+                grid = [[("name", 6)]]
+
+        self.assertIn("col-6", str(ItemForm()))
+
+    def test_decorated_model_form_grid(self):
+        @bootstrap_style_form
+        class ItemForm(forms.ModelForm):
+            class Meta:
+                model = Item
+                fields = ["name", "code"]
+
+            class Style:
+                grid = [[("name", 6), "code"]]
+                unplaced_fields = "report"
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", UnplacedFieldsWarning)
+            html = str(ItemForm())
+        self.assertIn('name="code"', html)
+
+    def test_grid_field_added_in_init(self):
+        class DynamicForm(BootstrapForm, forms.Form):
+            name = forms.CharField()
+
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.fields["extra"] = forms.CharField()
+
+            class Style:
+                grid = [["name", "extra"]]
+                check_grid_fields = False
+
+        self.assertIn('name="extra"', str(DynamicForm()))
+
+    def test_check_grid_fields(self):
+        class WrongForm(BootstrapForm, forms.Form):
+            name = forms.CharField()
+
+            class Style:
+                grid = [["name", "missing"]]
+
+        with self.assertRaisesMessage(ValueError, "Grid field 'missing' is not a field of WrongForm"):
+            WrongForm()
+
+    def test_width_class(self):
+        class PlainForm(StyledForm, forms.Form):
+            name = forms.CharField()
+
+            class Style:
+                grid = [[("name", "wide")]]
+                grid_class = Grid
+
+        self.assertEqual(Grid.get_column(("name", "wide")), ("name", "wide"))
+        with self.assertRaises(TypeError):
+            Grid.get_column(("name", 6))
+        self.assertIn('name="name"', str(PlainForm()))
+
+    def test_report_unplaced_fields(self):
+        class PartialForm(BootstrapForm, forms.Form):
+            name = forms.CharField()
+            code = forms.CharField()
+
+            class Style:
+                grid = [["name"]]
+                unplaced_fields = "report"
+
+        with self.assertWarnsMessage(UnplacedFieldsWarning, "Fields code of PartialForm"):
+            PartialForm()
+
+
+class BaseTheme:
+    css_classes = {"input": "my-input"}
+    grid = [["name"]]
+
+
+class Theme(BaseTheme):
+    fields_per_row = 1
+
+
+class InheritedStyleTests(SimpleTestCase):
+    def test_create_style(self):
+        @create_style(Theme)
+        class ThemedForm(forms.Form):
+            name = forms.CharField()
+
+        self.assertIn('class="my-input"', str(ThemedForm()))
+
+    def test_form_style(self):
+        class ThemedForm(BootstrapForm, forms.Form):
+            name = forms.CharField()
+
+            class Style(Theme):
+                pass
+
+        self.assertIn('class="my-input"', str(ThemedForm()))
+        self.assertEqual(ThemedForm.get_style().grid, [["name"]])
+
+
+class AsyncCleanForm(BootstrapForm, forms.Form):
+    name = forms.CharField()
+    code = forms.CharField()
+
+    async def clean_name(self):
+        await asyncio.sleep(0)
+        if self.cleaned_data["name"] == "taken":
+            raise forms.ValidationError("Name is taken")
+        return self.cleaned_data["name"].upper()
+
+    def clean_code(self):
+        return self.cleaned_data["code"].lower()
+
+
+class AsyncCleanTests(SimpleTestCase):
+    async def test_ais_valid(self):
+        form = AsyncCleanForm(data={"name": "new", "code": "ABC"})
+        self.assertTrue(await form.ais_valid())
+        self.assertEqual(form.cleaned_data, {"name": "NEW", "code": "abc"})
+
+    async def test_ais_valid_error(self):
+        form = AsyncCleanForm(data={"name": "taken", "code": "ABC"})
+        self.assertFalse(await form.ais_valid())
+        self.assertEqual(form.errors["name"], ["Name is taken"])
+        self.assertIn("is-invalid", form.fields["name"].widget.attrs["class"])
+
+    async def test_ais_valid_error_order(self):
+        form = AsyncCleanForm(data={"name": "taken"})
+        self.assertFalse(await form.ais_valid())
+        self.assertEqual(list(form.errors), ["name", "code"])
+
+    def test_sync_validation_refuses_async_hook(self):
+        form = AsyncCleanForm(data={"name": "new", "code": "ABC"})
+        with self.assertRaisesMessage(TypeError, "clean_name is async, validate the form with ais_valid()"):
+            form.is_valid()
+
+    def test_parallel_validation_refuses_async_hook(self):
+        class ParallelForm(AsyncCleanForm):
+            class Style:
+                parallel_clean = True
+
+        form = ParallelForm(data={"name": "new", "code": "ABC"})
+        with self.assertRaisesMessage(TypeError, "clean_name is async"):
+            form.is_valid()
+
+    def test_sync_hook_returning_awaitable(self):
+        class AwaitableForm(BootstrapForm, forms.Form):
+            name = forms.CharField()
+
+            def clean_name(self):
+                return asyncio.sleep(0)
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", RuntimeWarning)
+            with self.assertRaises(TypeError):
+                AwaitableForm(data={"name": "new"}).is_valid()
+
+
+class AsyncDatabaseTests(TestCase):
+    async def test_model_choice_field(self):
+        item = await Item.objects.acreate(name="a", code="a")
+
+        class ChoiceForm(AsyncCleanForm):
+            item = forms.ModelChoiceField(queryset=Item.objects.all())
+
+        form = ChoiceForm(data={"name": "new", "code": "ABC", "item": str(item.pk)})
+        self.assertTrue(await form.ais_valid())
+        self.assertEqual(form.cleaned_data["item"], item)
+
+    async def test_model_form_unique(self):
+        await Item.objects.acreate(name="a", code="a")
+
+        class ItemForm(BootstrapForm, forms.ModelForm):
+            class Meta:
+                model = Item
+                fields = ["name", "code"]
+
+            async def clean_name(self):
+                return self.cleaned_data["name"]
+
+        form = ItemForm(data={"name": "b", "code": "a"})
+        self.assertFalse(await form.ais_valid())
+        self.assertIn("code", form.errors)
+        self.assertTrue(await ItemForm(data={"name": "b", "code": "b"}).ais_valid())
+
+
+class InputClassTests(SimpleTestCase):
+    def test_class_added_in_init(self):
+        class ExtraForm(BootstrapForm, forms.Form):
+            name = forms.CharField()
+
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.fields["name"].widget.attrs["class"] += " extra"
+
+        form = ExtraForm(data={"name": "x"})
+        self.assertEqual(form.fields["name"].widget.attrs["class"], "form-control extra")
+        form.is_valid()
+        form.full_clean()
+        self.assertEqual(form.fields["name"].widget.attrs["class"], "form-control extra is-valid")
+
+    def test_state_changes(self):
+        form = RowForm(data={"name": "long", "code": "x", "token": "t"})
+        form.is_valid()
+        self.assertEqual(form.fields["name"].widget.attrs["class"], "form-control is-invalid")
+        form.data = {"name": "abc", "code": "x", "token": "t"}
+        form.full_clean()
+        self.assertEqual(form.fields["name"].widget.attrs["class"], "form-control is-valid")
+
+
+class SlowForm(BootstrapForm, forms.Form):
+    name = forms.CharField()
+    code = forms.CharField()
+    count = forms.IntegerField()
+
+    def clean_name(self):
+        if self.cleaned_data["name"] == "taken":
+            raise forms.ValidationError("Name is taken")
+        return self.cleaned_data["name"].upper()
+
+    def clean_code(self):
+        return self.cleaned_data["code"].lower()
+
+
+class ParallelCleanTests(SimpleTestCase):
+    def make_form(self, workers=4, timeout=None, **attrs):
+        style = type("Style", (), {
+            "parallel_clean": True, "parallel_clean_workers": workers, "parallel_clean_timeout": timeout,
+        })
+        return type("ParallelForm", (SlowForm,), dict(attrs, Style=style))
+
+    def test_same_result(self):
+        for workers in (1, 4):
+            form_class = self.make_form(workers)
+            for data in ({"name": "a", "code": "B", "count": "1"}, {"name": "taken", "code": "B", "count": "x"}, {}):
+                form = form_class(data=data)
+                sequential = SlowForm(data=data)
+                self.assertEqual(form.is_valid(), sequential.is_valid())
+                self.assertEqual(form.errors, sequential.errors)
+                self.assertEqual(list(form.cleaned_data.items()), list(sequential.cleaned_data.items()))
+                self.assertEqual(form.as_div(), sequential.as_div())
+
+    def test_timeout(self):
+        release = threading.Event()
+
+        def clean_name(self):
+            release.wait(5)
+            return self.cleaned_data["name"]
+
+        slow_class = self.make_form(workers=1, timeout=0.05, clean_name=clean_name)
+        try:
+            form = slow_class(data={"name": "a", "code": "B", "count": "1"})
+            self.assertFalse(form.is_valid())
+            self.assertEqual(form.errors["name"], ["Validation timed out."])
+            self.assertEqual(form.cleaned_data, {"code": "b", "count": 1})
+            # Other form classes have their own workers
+            other = self.make_form(workers=1, timeout=1)(data={"name": "a", "code": "B", "count": "1"})
+            self.assertTrue(other.is_valid())
+        finally:
+            release.set()
+
+    def test_classes_not_kept(self):
+        refs = []
+        for i in range(5):
+            form_class = self.make_form()
+            self.assertTrue(form_class(data={"name": "a", "code": "B", "count": "1"}).is_valid())
+            refs.append(weakref.ref(form_class))
+        del form_class
+        gc.collect()
+        self.assertEqual([ref() for ref in refs], [None] * 5)
+        threads = [thread for thread in threading.enumerate() if thread.name.startswith("styled-forms-clean")]
+        self.assertLessEqual(len(threads), 16)
+
+    def test_theme_option(self):
+        theme = themes.compile_theme({"name": "parallel", "options": {"parallel_clean": ["name"]}})
+        self.assertEqual(themes.build_style(theme).parallel_clean, ("name",))
+        with self.assertRaisesMessage(themes.ThemeError, "option 'parallel_clean' must be a list of strings"):
+            themes.compile_theme({"name": "parallel", "options": {"parallel_clean": [1]}})
+        with self.assertRaisesMessage(themes.ThemeError, "wrong type of option 'parallel_clean'"):
+            themes.compile_theme({"name": "parallel", "options": {"parallel_clean": "name"}})
+
+
+class RowForm(BootstrapForm, forms.Form):
+    name = forms.CharField(max_length=3)
+    code = forms.CharField()
+    token = forms.CharField(widget=forms.HiddenInput)
+
+    class Style:
+        grid = [[("name", 6), "code"]]
+
+
+class FieldRowTests(SimpleTestCase):
+    def test_row_of_full_render(self):
+        data = {"name": "long", "code": "x"}
+        html = str(RowForm(data=data))
+        row = RowForm(data=data).render_field_row("name")
+        self.assertIn("Ensure this value has at most 3 characters", row)
+        self.assertTrue(row.startswith("<div class='col-6'>"))
+        self.assertIn(row, html)
+
+    def test_form_is_validated_again(self):
+        form = RowForm(data={"name": "abc"})
+        form.render_field_row("name")
+        self.assertFalse(form.is_valid())
+        self.assertEqual(set(form.errors), {"code", "token"})
+
+    def test_validated_form(self):
+        form = RowForm(data={"name": "long"})
+        form.is_valid()
+        self.assertIn("is-invalid", form.render_field_row("code"))
+        self.assertEqual(set(form.errors), {"name", "code", "token"})
+
+    def test_column_plans(self):
+        class AppendForm(RowForm):
+            extra = forms.CharField()
+
+            class Style:
+                grid = [[("name", 6), "code"]]
+                unplaced_fields = "append"
+
+        style = AppendForm.get_style()
+        self.assertEqual(set(style.field_plans), {"name", "code"})
+        with self.assertRaises(TypeError):
+            style.field_plans["extra"] = None
+        form = AppendForm(data={"name": "abc", "code": "x", "extra": ""})
+        html = str(form)
+        for name in ("name", "extra"):
+            self.assertIn(form.render_field_row(name), html)
+        self.assertEqual(set(style.field_plans), {"name", "code"})
+
+    def test_changed_rows(self):
+        data = {"name": "abc", "code": "x", "token": "t"}
+        self.assertEqual(RowForm(data=data).render_changed_rows(), {})
+        form = RowForm(data=dict(data, name="long"))
+        rows = form.render_changed_rows()
+        self.assertEqual(list(rows), ["name"])
+        self.assertEqual(rows["name"], form.render_rows()["name"])
+        self.assertIn("is-invalid", rows["name"])
+        form = RowForm(data={"name": "long"})
+        self.assertEqual(list(form.render_changed_rows()), ["name", "code"])
+        self.assertEqual(form.fields["name"].widget.attrs["class"], "form-control is-invalid")
+        self.assertEqual(form.fields["token"].widget.attrs["class"], "form-control is-invalid")
+
+    def test_changed_rows_previous(self):
+        previous = RowForm(data={"name": "long", "code": "x", "token": "t"}).render_rows()
+        self.assertEqual(RowForm(data={"name": "long", "code": "x", "token": "t"}).render_changed_rows(previous), {})
+        form = RowForm(data={"name": "abc", "code": "x", "token": "t"})
+        rows = form.render_changed_rows(previous)
+        self.assertEqual(list(rows), ["name"])
+        self.assertIn("is-valid", rows["name"])
+
+    def test_view(self):
+        view = FieldRowView.as_view(form_class=RowForm)
+        response = view(RequestFactory().post("/", {"name": "long"}), field="name")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"is-invalid", response.content)
+        response = view(RequestFactory().post("/?field=missing", {}))
+        self.assertEqual(response.status_code, 400)
+
+
+class CachedForm(BootstrapForm, forms.Form):
+    name = forms.CharField()
+    kind = forms.ChoiceField(choices=[("a", "A"), ("b", "B")])
+
+    class Style:
+        fragment_cache = True
+
+
+class FragmentCacheTests(SimpleTestCase):
+    def setUp(self):
+        CachedForm.get_style().fragments.clear()
+
+    def test_cached_render(self):
+        html = CachedForm().as_div()
+        self.assertEqual(len(CachedForm.get_style().fragments), 1)
+        self.assertEqual(CachedForm().as_div(), html)
+        self.assertEqual(CachedForm().get_fragment_cache_key(), CachedForm().get_fragment_cache_key())
+
+    def test_key_state(self):
+        key = CachedForm().get_fragment_cache_key()
+        self.assertNotEqual(CachedForm(initial={"name": "x"}).get_fragment_cache_key(), key)
+        self.assertNotEqual(CachedForm(prefix="p").get_fragment_cache_key(), key)
+        self.assertNotEqual(CachedForm(use_required_attribute=False).get_fragment_cache_key(), key)
+
+    def test_widget_class(self):
+        class PasswordForm(CachedForm):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.fields["name"].widget = forms.PasswordInput(attrs=self.fields["name"].widget.attrs)
+
+        CachedForm().as_div()
+        self.assertIn('type="password"', PasswordForm().as_div())
+        self.assertNotEqual(PasswordForm().get_fragment_cache_key(), CachedForm().get_fragment_cache_key())
+
+    @override_settings(USE_I18N=True)
+    def test_language(self):
+        class LocalizedForm(CachedForm):
+            answer = forms.NullBooleanField()
+            day = forms.DateField(initial=datetime.date(2020, 3, 4), localize=True)
+
+        with translation.override("de"):
+            german = LocalizedForm().as_div()
+        with translation.override("en"):
+            english = LocalizedForm().as_div()
+            self.assertEqual(english, LocalizedForm().as_div())
+        self.assertIn("Unbekannt", german)
+        self.assertIn("04.03.2020", german)
+        self.assertNotIn("Unbekannt", english)
+        self.assertIn("2020-03-04", english)
+        self.assertEqual(len(LocalizedForm.get_style().fragments), 2)
+
+    def test_bypass(self):
+        self.assertIsNone(CachedForm(data={"name": "x"}).get_fragment_cache_key())
+        form = CachedForm()
+        del form.fields["kind"]
+        self.assertIsNone(form.get_fragment_cache_key())
+        form = CachedForm()
+        form.fields["kind"].choices = lambda: [("c", "C")]
+        self.assertIsNone(form.get_fragment_cache_key())
+        form.as_div()
+        self.assertEqual(len(CachedForm.get_style().fragments), 0)
+
+
+class ChoiceForm(BootstrapForm, forms.Form):
+    kind = forms.ChoiceField(choices=[("a", "A & 1"), ("Group", [("b", "B"), ("c", "C")])])
+    kinds = forms.MultipleChoiceField(choices=[("a", "A"), ("b", "B"), ("c", "C")], required=False)
+
+
+class CachedChoiceForm(ChoiceForm):
+    class Style:
+        choice_cache = True
+
+
+class ChoiceCacheTests(SimpleTestCase):
+    def test_select_options(self):
+        body = '<option value="a">A</option><option value="b">B</option>'
+        self.assertEqual(
+            choices.select_options(body, "b", False),
+            '<option value="a">A</option><option value="b" selected>B</option>',
+        )
+        self.assertEqual(
+            choices.select_options(body, ["a", "b"], True),
+            '<option value="a" selected>A</option><option value="b" selected>B</option>',
+        )
+        self.assertIsNone(choices.select_options(body, ["a", "b"], False))
+
+    def test_same_output(self):
+        for data in (None, {"kind": "c", "kinds": ["a", "c"]}, {"kind": "a"}, {"kind": "x"}):
+            plain = ChoiceForm(data=data) if data is not None else ChoiceForm()
+            cached = CachedChoiceForm(data=data) if data is not None else CachedChoiceForm()
+            # second render uses the cached options
+            cached.as_div()
+            self.assertHTMLEqual(cached.as_div(), plain.as_div())
+            self.assertEqual(cached.as_div(), plain.as_div())
+
+    def test_bump_version(self):
+        form = CachedChoiceForm()
+        key = choices.get_choices_key(form, "kind", form.fields["kind"])
+        choices.bump_version(CachedChoiceForm, "kind")
+        self.assertNotEqual(choices.get_choices_key(form, "kind", form.fields["kind"]), key)
+
+
+class ContactForm(BootstrapForm, forms.Form):
+    name = forms.CharField(max_length=5)
+    email = forms.EmailField(required=False)
+    token = forms.CharField(widget=forms.HiddenInput, required=False)
+
+    class Style:
+        grid = [[("name", 6), ("email", 6)]]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get("name") == "both":
+            raise forms.ValidationError("Name and email don't match")
+        if cleaned_data.get("token") == "bad":
+            self.add_error("token", "Bad token")
+        return cleaned_data
+
+
+class SemanticContactForm(SemanticUIForm, forms.Form):
+    name = forms.CharField()
+
+
+ContactFormSet = formset_factory(ContactForm, formset=StyledFormSet, extra=2)
+
+
+class RenderManyTests(SimpleTestCase):
+    data = {
+        "contacts-TOTAL_FORMS": "3",
+        "contacts-INITIAL_FORMS": "0",
+        "contacts-0-name": "ann",
+        "contacts-0-email": "ann@example.com",
+        "contacts-1-name": "toolong",
+        "contacts-1-email": "wrong",
+        "contacts-1-token": "bad",
+        "contacts-2-name": "both",
+    }
+
+    def assertSameAsForms(self, make_formset):
+        formset = make_formset()
+        html = str(make_formset())
+        self.assertEqual(html, (str(formset.management_form) + "".join(str(form) for form in formset.forms)).strip())
+        self.assertEqual(render_many(make_formset().forms), [str(form) for form in make_formset().forms])
+        return html
+
+    def test_unbound(self):
+        html = self.assertSameAsForms(lambda: ContactFormSet(prefix="contacts"))
+        self.assertIn('name="contacts-TOTAL_FORMS" value="2"', html)
+        self.assertIn('name="contacts-1-name"', html)
+
+    def test_bound(self):
+        html = self.assertSameAsForms(lambda: ContactFormSet(self.data, prefix="contacts"))
+        self.assertIn("Enter a valid email address", html)
+
+    def test_validated(self):
+        formset = ContactFormSet(self.data, prefix="contacts")
+        self.assertFalse(formset.is_valid())
+        self.assertEqual(render_many(formset.forms), [str(form) for form in formset.forms])
+
+    def test_mixed_forms(self):
+        class PlainContactForm(ContactForm):
+            class Style:
+                grid = None
+
+        forms_list = [
+            ContactForm(), SemanticContactForm(), ContactForm(data={"name": "toolong"}),
+            PlainContactForm(data={"name": "both"}), PlainContactForm(data={"name": "ann", "token": "bad"}),
+            ContactForm(),
+        ]
+        output = render_many(forms_list)
+        self.assertEqual(output, [str(form) for form in forms_list])
+        self.assertIn("Name and email don&#x27;t match", output[3])
+        self.assertIn("Bad token", output[4])
+
+
+EXAMPLE_FORMS = [examples.TestForm, examples.TestForm1, examples.TestForm2, examples.TestForm3, examples.TestForm4]
+
+
+@unittest.skipIf(jinja2 is None, "Jinja2 is not installed")
+class JinjaTests(SimpleTestCase):
+    def setUp(self):
+        from .jinja import environment
+        self.env = environment(autoescape=True)
+
+    def render_django(self, source, form):
+        return Template(source).render(Context({"form": form}))
+
+    def test_same_output(self):
+        template = self.env.from_string("{{ form|styled }}")
+        restyled = self.env.from_string('{{ form|custom_style("bootstrap")|styled }}')
+        for form_class in EXAMPLE_FORMS:
+            cases = [None]
+            # TestForm4 date field can't clean the values of its SplitDateTimeWidget
+            if form_class is not examples.TestForm4:
+                cases += [{}, {"name": "a", "email": "a@example.com", "check": "on"}]
+            for data in cases:
+                with self.subTest(form=form_class.__name__, data=data):
+                    make = (lambda: form_class()) if data is None else (lambda: form_class(data=data))
+                    self.assertEqual(template.render(form=make()), self.render_django("{{ form }}", make()))
+                    self.assertEqual(
+                        restyled.render(form=make()),
+                        self.render_django('{{ form|custom_style:"bootstrap" }}', make()),
+                    )
+
+
+BRAND_TOML = """
+name = "test_brand"
+extends = "bootstrap"
+
+[css_classes]
+input = "form-control brand-input"
+
+[rows]
+default = '<div class="${input_group} brand-row">%(label)s%(field)s%(errors)s</div>'
+
+[grid]
+row_start = "<div class='row'>"
+row_end = "</div>"
+column_class = "col"
+width_class = "col-md-{width}"
+max_width = 12
+"""
+
+
+class ThemeTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.dir.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return path
+
+    def test_toml_theme(self):
+        self.write("brand.toml", BRAND_TOML)
+        registry = StylesData()
+        registry.register("bootstrap", styles.Bootstrap)
+        themes.load_themes([self.dir.name], registry=registry)
+        style = styles.Style(style=styles.merge_styles(
+            registry.get_style("test_brand"), type("Style", (), {"grid": [[("name", 6)]]})
+        ))
+        self.assertEqual(style.css_classes["input"], "form-control brand-input")
+        self.assertEqual(style.css_classes["valid_input"], "is-valid")
+        self.assertEqual(style.rows["normal"] % {"label": "L", "field": "F", "errors": "E"},
+                         '<div class="form-group brand-row">LFE</div>')
+        self.assertIn("<div class='row'><div class='col-md-6'>", "".join(
+            part for part in style.grid_plan if isinstance(part, str)
+        ))
+
+    def test_json_theme_form(self):
+        self.write("plain.json", json.dumps({
+            "name": "test_plain",
+            "css_classes": {"input": "plain-input"},
+            "options": {"collapse_whitespace": True},
+        }))
+        themes.load_themes([self.dir.name])
+
+        class PlainForm(StyledForm, forms.Form):
+            style_name = "test_plain"
+            name = forms.CharField()
+
+        self.assertIn('class="plain-input"', str(PlainForm()))
+        self.assertTrue(PlainForm.get_style().collapse_whitespace)
+
+    def test_errors(self):
+        with self.assertRaisesMessage(themes.ThemeError, "broken: unknown key 'colors'"):
+            themes.compile_theme({"name": "broken", "colors": {}})
+        with self.assertRaisesMessage(themes.ThemeError, "broken: unknown placeholder 'title' in row 'normal'"):
+            themes.compile_theme({"name": "broken", "rows": {"normal": "%(title)s"}})
+        with self.assertRaisesMessage(themes.ThemeError, "broken: unknown option 'colour'"):
+            themes.compile_theme({"name": "broken", "options": {"colour": "red"}})
+        path = self.write("broken.json", "{")
+        with self.assertRaisesMessage(themes.ThemeError, path):
+            themes.read_theme(path)
+        with self.assertRaisesMessage(themes.ThemeError, "broken: grid key 'max_width' must be int"):
+            themes.compile_theme({"name": "broken", "grid": {"max_width": "4"}})
+        narrow = themes.build_style(themes.compile_theme({"name": "narrow", "grid": {"max_width": 4}}))
+        with self.assertRaisesMessage(ValueError, "Field width must be between 1 and 4"):
+            styles.Style(style=styles.merge_styles(narrow, type("Style", (), {"grid": [[("name", 6)]]})))
+
+    def test_cache(self):
+        path = self.write("brand.toml", BRAND_TOML)
+        cache = os.path.join(self.dir.name, "cache.json")
+        compiled = json.loads(json.dumps(themes.compile_themes([path], cache)))
+        self.assertEqual(themes.compile_themes([path], cache), compiled)
+        with open(cache, encoding="utf-8") as f:
+            data = json.load(f)
+        data["themes"] = "cached"
+        with open(cache, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        # Unchanged sources are loaded from the cache file
+        self.assertEqual(themes.compile_themes([path], cache), "cached")
+        self.write("brand.toml", BRAND_TOML.replace("brand-input", "brand-input wide"))
+        changed = json.loads(json.dumps(themes.compile_themes([path], cache)))
+        self.assertEqual(changed[0]["css_classes"]["input"], "form-control brand-input wide")
+        self.assertEqual(themes.compile_themes([path], cache), changed)
+
+
+class FullRenderer(FieldRenderer):
+    """Renderer which always takes the path of forms with errors"""
+    __slots__ = ()
+
+    def __init__(self, form, *args):
+        super().__init__(form, *args)
+        self.error_free = False
+        self.top_errors = form.non_field_errors().copy()
+
+
+class ErrorFreeRenderTests(SimpleTestCase):
+    def assertSameAsFullRender(self, form_class, data):
+        make = (lambda: form_class()) if data is None else (lambda: form_class(data=data))
+        fast = str(make())
+        with mock.patch("styled_forms.forms.forms.FieldRenderer", FullRenderer):
+            full = str(make())
+        self.assertEqual(fast, full)
+        return fast
+
+    def test_same_output(self):
+        class CssContactForm(ContactForm):
+            required_css_class = "required"
+            error_css_class = "error"
+
+        class PlainContactForm(CssContactForm):
+            class Style:
+                grid = None
+
+        cases = [
+            None,
+            {"name": "ann", "email": "ann@example.com"},
+            {"name": "toolong", "email": "wrong"},
+            {"name": "both"},
+            {"name": "ann", "token": "bad"},
+        ]
+        for form_class in (ContactForm, CssContactForm, PlainContactForm, RowForm, *EXAMPLE_FORMS[:4]):
+            for data in cases:
+                with self.subTest(form=form_class.__name__, data=data):
+                    self.assertSameAsFullRender(form_class, data)
+        self.assertIn("Name and email don&#x27;t match", self.assertSameAsFullRender(PlainContactForm, cases[3]))
+        self.assertIn("(Hidden field token) * Bad token", self.assertSameAsFullRender(PlainContactForm, cases[4]))
+
+
+class IterHtmlTests(SimpleTestCase):
+    def test_same_as_str(self):
+        class CachedContactForm(ContactForm):
+            class Style:
+                grid = [[("name", 6), ("email", 6)]]
+                fragment_cache = True
+
+        for form_class in (ContactForm, CachedContactForm, RowForm, *EXAMPLE_FORMS):
+            cases = [None]
+            if form_class is not examples.TestForm4:
+                cases += [{}, {"name": "toolong", "email": "a@example.com", "token": "bad"}]
+            for data in cases:
+                with self.subTest(form=form_class.__name__, data=data):
+                    make = (lambda: form_class()) if data is None else (lambda: form_class(data=data))
+                    chunks = list(make().iter_html())
+                    self.assertEqual("".join(chunks), str(make()))
+                    if form_class is RowForm:
+                        self.assertGreater(len(chunks), 1)
+        # Second render comes from the fragment cache
+        self.assertEqual("".join(CachedContactForm().iter_html()), str(CachedContactForm()))
+
+    def make_form(self, unplaced_fields):
+        class PartialForm(BootstrapForm, forms.Form):
+            name = forms.CharField()
+            code = forms.CharField()
+            notes = forms.CharField(required=False)
+            token = forms.CharField(widget=forms.HiddenInput, required=False)
+
+            Style = type("Style", (), {"grid": [[("name", 6)]], "unplaced_fields": unplaced_fields})
+
+        return PartialForm
+
+    def test_unplaced_fields(self):
+        html = str(self.make_form("ignore")())
+        self.assertNotIn('name="code"', html)
+        self.assertIn('name="token"', html)
+
+        form_class = self.make_form("append")
+        html = str(form_class())
+        self.assertLess(html.index('name="name"'), html.index('name="code"'))
+        self.assertLess(html.index('name="code"'), html.index('name="notes"'))
+        self.assertLess(html.index('name="notes"'), html.index('name="token"'))
+        self.assertEqual("".join(form_class().iter_html()), html)
+        self.assertIn(form_class().render_field_row("code"), html)
+
+        with self.assertWarnsMessage(UnplacedFieldsWarning, "Fields code, notes of PartialForm"):
+            html = str(self.make_form("report")())
+        self.assertNotIn('name="code"', html)
+
+
+class InstrumentationTests(SimpleTestCase):
+    def test_collector_abc(self):
+        with self.assertRaises(TypeError):
+            instrumentation.Collector()
+
+    async def test_context_collector(self):
+        collector = instrumentation.ContextCollector()
+        collector.start()
+        instrumentation.add_collector(collector)
+        try:
+            RowForm(data={"name": "abc"}).as_div()
+            await sync_to_async(lambda: ContactForm().as_div())()
+            await asyncio.create_task(AsyncCleanForm(data={"name": "a", "code": "b"}).ais_valid())
+            # Thread started without the context belongs to another request
+            thread = threading.Thread(target=lambda: RowForm().as_div())
+            thread.start()
+            thread.join()
+        finally:
+            instrumentation.remove_collector(collector)
+            collector.stop()
+        names = {name for name, form_id, phase, duration, field_count in collector.records}
+        self.assertEqual(names, {"RowForm", "ContactForm", "AsyncCleanForm"})
+        phases = {(name, phase) for name, form_id, phase, duration, field_count in collector.records}
+        self.assertIn(("RowForm", instrumentation.CLEAN), phases)
+        self.assertIn(("ContactForm", instrumentation.FIELDS), phases)
+        self.assertEqual(len({form_id for name, form_id, *rest in collector.records if name == "RowForm"}), 1)
+        self.assertEqual(instrumentation.context_collectors.get(), ())
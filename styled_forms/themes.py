@@ -0,0 +1,384 @@
+"""
+Declarative styles loaded from TOML or JSON files.
+
+A theme file describes css classes, row templates and grid rules::
+
+    name = "brand"
+    extends = "bootstrap"
+
+    [css_classes]
+    input = "form-control brand-input"
+
+    [rows]
+    normal = '''
+    <div class="${input_group} brand-row">
+        %(label)s
+        %(field)s
+        %(errors)s
+        %(help_text)s
+    </div>
+    '''
+
+    [options]
+    collapse_whitespace = true
+
+    [grid]
+    row_start = "<div class='row'>\\n"
+    row_end = "</div>\\n"
+    column_class = "col"
+    width_class = "col-md-{width}"
+    max_width = 12
+
+Row templates use the same %(name)s placeholders as the get_*_row methods,
+${key} is replaced with css class of the resolved style and $$ with $.
+The "default" row is used for normal, checkbox and file rows the theme doesn't set.
+Grid is either a name of built-in grid ("none", "bootstrap", "semanticui") or a table.
+
+load_themes validates and compiles the files and registers them in the styles
+registry. With cache path the compiled themes are written to a single JSON file,
+which is loaded instead of the sources until any of them changes::
+
+    python -m styled_forms.themes themes.cache.json themes/
+"""
+import json
+import os
+import re
+import sys
+
+from .styles import (
+    ROW_VALUES, BootstrapGrid, Grid, RowTemplate, SemanticUIGrid, Style, indent_re, merge_styles, num_to_words,
+    styles,
+)
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+CACHE_VERSION = 1
+
+KEYS = ("name", "extends", "css_classes", "rows", "options", "grid")
+ROWS = ("normal", "checkbox", "file", "error")
+OPTIONS = {
+    "use_form_group_div": bool,
+    "fields_per_row": int,
+    "errors_on_separate_row": bool,
+    "collapse_whitespace": bool,
+    "check_grid_fields": bool,
+    "unplaced_fields": str,
+    "fragment_cache": bool,
+    "fragment_cache_size": int,
+    "fragment_cache_ttl": (int, float),
+    "fragment_cache_backend": str,
+    "choice_cache": bool,
+    "choice_cache_size": int,
+    "choice_cache_ttl": (int, float),
+    "clean_concurrency": int,
+    # true or list of field names
+    "parallel_clean": (bool, list),
+    "parallel_clean_workers": int,
+    "parallel_clean_timeout": (int, float),
+}
+GRID_KEYS = ("row_start", "row_end", "column_class", "width_class", "max_width")
+grid_classes = {
+    "none": Grid,
+    "bootstrap": BootstrapGrid,
+    "semanticui": SemanticUIGrid,
+}
+
+css_ref_re = re.compile(r"\$\$|\$\{(\w+)\}")
+
+
+class ThemeError(ValueError):
+    pass
+
+
+class ThemeGrid(Grid):
+    """Grid built from the grid table of a theme"""
+    width_class = "{width}"
+    max_width = None
+
+    @classmethod
+    def compile(cls, grid, errors_on_separate_row=False):
+        if not grid:
+            return None
+        return cls.compile_rows(grid, errors_on_separate_row)
+
+    @classmethod
+    def get_width_class(cls, width):
+        if isinstance(width, int):
+            if cls.max_width is not None and not 1 <= width <= cls.max_width:
+                raise ValueError("Field width must be between 1 and %d" % cls.max_width)
+            return cls.width_class.format(width=width, words=num_to_words.get(width, width))
+        elif isinstance(width, str):
+            return cls.width_class.format(width=width, words=width)
+        raise TypeError("Wrong width type")
+
+
+def read_theme(path):
+    """Return theme data of TOML or JSON file, theme name defaults to the file name"""
+    if path.endswith(".toml"):
+        if tomllib is None:
+            raise ThemeError("%s: reading TOML themes requires Python 3.11 or tomli" % path)
+        with open(path, "rb") as f:
+            try:
+                data = tomllib.load(f)
+            except tomllib.TOMLDecodeError as e:
+                raise ThemeError("%s: %s" % (path, e))
+    else:
+        with open(path, encoding="utf-8") as f:
+            try:
+                data = json.load(f)
+            except ValueError as e:
+                raise ThemeError("%s: %s" % (path, e))
+    if not isinstance(data, dict):
+        raise ThemeError("%s: theme must be a table" % path)
+    data.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+    return data
+
+
+def compile_row(kind, source, name):
+    """Return JSON serializable row compiled into literal parts and slots"""
+    if not isinstance(source, str):
+        raise ThemeError("%s: row '%s' must be a string" % (name, kind))
+    template = RowTemplate(source)
+    for _, slot in template.slots:
+        if kind == "error":
+            if slot is not None:
+                raise ThemeError("%s: error row takes only %%s placeholder, got '%s'" % (name, slot))
+        elif slot not in ROW_VALUES:
+            raise ThemeError("%s: unknown placeholder '%s' in row '%s'" % (name, slot, kind))
+    refs = sorted({
+        match.group(1)
+        for part in template.parts if part
+        for match in css_ref_re.finditer(part) if match.group(1)
+    })
+    return {"parts": template.parts, "slots": template.slots, "css": refs}
+
+
+def compile_grid(grid, name):
+    if isinstance(grid, str):
+        if grid not in grid_classes:
+            raise ThemeError("%s: unknown grid '%s'" % (name, grid))
+        return grid
+    if not isinstance(grid, dict):
+        raise ThemeError("%s: grid must be a name or a table" % name)
+    for key, value in grid.items():
+        if key not in GRID_KEYS:
+            raise ThemeError("%s: unknown grid key '%s'" % (name, key))
+        expected = int if key == "max_width" else str
+        if not isinstance(value, expected) or isinstance(value, bool):
+            raise ThemeError("%s: grid key '%s' must be %s" % (name, key, expected.__name__))
+    try:
+        grid.get("width_class", ThemeGrid.width_class).format(width=1, words="one")
+    except (KeyError, IndexError, ValueError) as e:
+        raise ThemeError("%s: wrong grid width_class: %s" % (name, e))
+    return dict(grid)
+
+
+def compile_theme(data):
+    """Validate theme data and return it compiled, ready to be cached or registered"""
+    name = data.get("name")
+    if not isinstance(name, str) or not name:
+        raise ThemeError("Theme name must be a non empty string")
+    for key in data:
+        if key not in KEYS:
+            raise ThemeError("%s: unknown key '%s'" % (name, key))
+    extends = data.get("extends")
+    if extends is not None and not isinstance(extends, str):
+        raise ThemeError("%s: extends must be a style name" % name)
+
+    css_classes = data.get("css_classes", {})
+    if not isinstance(css_classes, dict):
+        raise ThemeError("%s: css_classes must be a table" % name)
+    for key, value in css_classes.items():
+        if not isinstance(value, str):
+            raise ThemeError("%s: css class '%s' must be a string" % (name, key))
+
+    rows = data.get("rows", {})
+    if not isinstance(rows, dict):
+        raise ThemeError("%s: rows must be a table" % name)
+    rows = dict(rows)
+    default = rows.pop("default", None)
+    for key in rows:
+        if key not in ROWS:
+            raise ThemeError("%s: unknown row '%s'" % (name, key))
+    if default is not None:
+        for key in ("normal", "checkbox", "file"):
+            rows.setdefault(key, default)
+
+    options = data.get("options", {})
+    if not isinstance(options, dict):
+        raise ThemeError("%s: options must be a table" % name)
+    for key, value in options.items():
+        if key not in OPTIONS:
+            raise ThemeError("%s: unknown option '%s'" % (name, key))
+        expected = OPTIONS[key]
+        if not isinstance(expected, tuple):
+            expected = (expected,)
+        if not isinstance(value, expected) or (isinstance(value, bool) and bool not in expected):
+            raise ThemeError("%s: wrong type of option '%s'" % (name, key))
+        if isinstance(value, list) and not all(isinstance(item, str) for item in value):
+            raise ThemeError("%s: option '%s' must be a list of strings" % (name, key))
+
+    grid = data.get("grid")
+    return {
+        "name": name,
+        "extends": extends,
+        "css_classes": dict(css_classes),
+        "rows": {kind: compile_row(kind, source, name) for kind, source in rows.items()},
+        "options": dict(options),
+        "grid": compile_grid(grid, name) if grid is not None else None,
+    }
+
+
+def substitute(part, css_classes):
+    return css_ref_re.sub(lambda m: css_classes[m.group(1)] if m.group(1) else "$", part)
+
+
+def row_method(row):
+    """Return get_*_row method returning the precompiled row"""
+    parts = row["parts"]
+    slots = row["slots"]
+    css = bool(row["css"])
+
+    def get_row(self):
+        row_parts = parts
+        if css:
+            row_parts = [substitute(p, self.css_classes) if p else p for p in row_parts]
+        if self.collapse_whitespace:
+            row_parts = [indent_re.sub("\n", p) if p else p for p in row_parts]
+        return RowTemplate.from_parts(row_parts, slots)
+    return get_row
+
+
+def build_style(theme, base=None):
+    """Return style class of the compiled theme, merged with base style class"""
+    name = theme["name"]
+    props = {key: tuple(value) if isinstance(value, list) else value for key, value in theme["options"].items()}
+    props["css_classes"] = theme["css_classes"]
+    for kind, row in theme["rows"].items():
+        props["get_%s_row" % kind] = row_method(row)
+    grid = theme["grid"]
+    if isinstance(grid, str):
+        props["grid_class"] = grid_classes[grid]
+    elif grid is not None:
+        grid = dict(grid)
+        if "column_class" in grid:
+            grid["default_column_class"] = grid.pop("column_class")
+        props["grid_class"] = type("%sGrid" % name, (ThemeGrid,), grid)
+
+    style = merge_styles(base, type(name, (), props))
+    style.__name__ = style.__qualname__ = name
+
+    known = set(Style.css_classes) | set(style.css_classes)
+    for kind, row in theme["rows"].items():
+        for ref in row["css"]:
+            if ref not in known:
+                raise ThemeError("%s: unknown css class '%s' in row '%s'" % (name, ref, kind))
+    return style
+
+
+def register_themes(themes, registry=styles):
+    """Register compiled themes, themes may extend each other. Return dict of name to style class"""
+    pending = {theme["name"]: theme for theme in themes}
+    registered = {}
+
+    def register(name, chain):
+        theme = pending.pop(name)
+        extends = theme["extends"]
+        base = None
+        if extends is not None:
+            if extends in chain:
+                raise ThemeError("%s: circular extends" % name)
+            if extends in pending:
+                register(extends, chain + (name,))
+            base = registry.get_style(extends)
+            if base is None:
+                raise ThemeError("%s: extended style '%s' not found" % (name, extends))
+        style = registered[name] = build_style(theme, base)
+        registry.register(name, style)
+
+    while pending:
+        register(next(iter(pending)), ())
+    return registered
+
+
+def find_files(paths):
+    """Return theme files, directories are searched for .toml and .json files"""
+    files = []
+    for path in map(os.fspath, paths):
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, f) for f in sorted(os.listdir(path)) if f.endswith((".toml", ".json"))
+            )
+        else:
+            files.append(path)
+    return files
+
+
+def get_sources(files):
+    sources = []
+    for path in files:
+        stat = os.stat(path)
+        sources.append([os.path.abspath(path), stat.st_mtime_ns, stat.st_size])
+    return sources
+
+
+def read_cache(path, sources):
+    """Return compiled themes from the cache file, or None if it is missing or stale"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != CACHE_VERSION or data.get("sources") != sources:
+        return None
+    return data["themes"]
+
+
+def write_cache(path, sources, themes):
+    tmp = "%s.%d.tmp" % (path, os.getpid())
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": CACHE_VERSION, "sources": sources, "themes": themes}, f)
+    os.replace(tmp, path)
+
+
+def compile_themes(paths, cache=None):
+    """Return compiled themes of the files, using and refreshing the cache file"""
+    files = find_files(paths)
+    sources = get_sources(files)
+    if cache is not None:
+        themes = read_cache(cache, sources)
+        if themes is not None:
+            return themes
+    themes = [compile_theme(read_theme(path)) for path in files]
+    names = [theme["name"] for theme in themes]
+    for name in names:
+        if names.count(name) > 1:
+            raise ThemeError("Theme '%s' is defined more than once" % name)
+    if cache is not None:
+        write_cache(cache, sources, themes)
+    return themes
+
+
+def load_themes(paths, cache=None, registry=styles):
+    """Compile theme files and register them. Return dict of name to style class"""
+    return register_themes(compile_themes(paths, cache), registry)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) < 2:
+        print("usage: python -m styled_forms.themes CACHE_FILE PATH [PATH ...]", file=sys.stderr)
+        return 2
+    themes = compile_themes(argv[1:], argv[0])
+    print("Compiled %d themes into %s" % (len(themes), argv[0]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,25 @@
+from django.http import HttpResponse, HttpResponseBadRequest
+from django.views.generic import View
+from django.views.generic.edit import FormMixin
+
+
+class FieldRowView(FormMixin, View):
+    """
+    Validate one field of the posted form and return html of its row,
+    for inline validation. Field name is taken from the "field" URL argument
+    or query parameter, so it doesn't clash with the form data::
+
+        path("contact/row/<str:field>/", FieldRowView.as_view(form_class=ContactForm))
+    """
+    http_method_names = ["post"]
+    field_kwarg = "field"
+
+    def get_field_name(self):
+        return self.kwargs.get(self.field_kwarg) or self.request.GET.get(self.field_kwarg)
+
+    def post(self, request, *args, **kwargs):
+        form = self.get_form()
+        name = self.get_field_name()
+        if name not in form.fields:
+            return HttpResponseBadRequest("Unknown field")
+        return HttpResponse(form.render_field_row(name))